@@ -0,0 +1,369 @@
+"""
+Channel layer that lets several ASGI workers share websocket groups through
+the PostgreSQL database, without Redis.
+
+Messages travel as NOTIFY payloads. Every layer instance LISTENs on one
+Postgres channel for its process-specific channels and on one per plain
+channel it receives from. Payloads over the NOTIFY size limit are stored in a
+table and only their id is sent. Group membership is a table whose rows expire
+after ``group_expiry`` seconds unless they are added again.
+
+The layer never blocks the event loop: queries run in a worker thread and the
+LISTEN connection is an asynchronous psycopg2 connection driven by the loop.
+
+Delivery is at most once, like Redis pub/sub: messages sent while a listener
+is reconnecting are lost. Messages must be JSON serializable.
+
+Enable it with CHANNEL_LAYER=postgres; see settings.py.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import psycopg2
+from psycopg2.extensions import POLL_OK, POLL_READ, POLL_WRITE
+from channels.layers import BaseChannelLayer
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class PostgresChannelLayer(BaseChannelLayer):
+    extensions = ["groups", "flush"]
+
+    # Postgres rejects NOTIFY payloads of 8000 bytes or more.
+    NOTIFY_LIMIT = 7900
+
+    def __init__(
+        self,
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        prefix="channels",
+        database="default",
+        dsn=None,
+    ):
+        super().__init__(
+            expiry=expiry, capacity=capacity, channel_capacity=channel_capacity
+        )
+        self.channel_capacity = self.compile_capacities(self.channel_capacity)
+        self.group_expiry = group_expiry
+        self.prefix = prefix
+        self.group_table = f"{prefix}_group"
+        self.message_table = f"{prefix}_message"
+        self.database = database
+        self.dsn = dsn
+        self.client_prefix = uuid.uuid4().hex
+
+        self.channels = {}
+        self.listening = set()
+        self.listen_connection = None
+        self.listen_fd = None
+        self.listen_loop = None
+        self.listen_lock = None
+
+        self.send_connection = None
+        self.send_lock = threading.Lock()
+        self.tables_ready = False
+
+    # Connections ------------------------------------------------------------
+
+    def connect(self, async_=False):
+        if self.dsn:
+            connection = psycopg2.connect(self.dsn, async_=async_)
+        else:
+            database = settings.DATABASES[self.database]
+            params = {
+                "dbname": database.get("NAME"),
+                "user": database.get("USER"),
+                "password": database.get("PASSWORD"),
+                "host": database.get("HOST"),
+                "port": database.get("PORT"),
+                **database.get("OPTIONS", {}),
+            }
+            connection = psycopg2.connect(
+                async_=async_,
+                **{key: value for key, value in params.items() if value},
+            )
+        if not async_:
+            # Asynchronous connections are always in autocommit mode.
+            connection.autocommit = True
+        return connection
+
+    async def wait(self, connection):
+        # Polls an asynchronous connection until its pending connect or query
+        # is done, waiting on the socket in between.
+        loop = asyncio.get_running_loop()
+        while True:
+            state = connection.poll()
+            # libpq may switch sockets while connecting, e.g. from ::1 to
+            # 127.0.0.1 for localhost.
+            fd = connection.fileno()
+            if state == POLL_OK:
+                return
+            ready = loop.create_future()
+
+            def wake():
+                if not ready.done():
+                    ready.set_result(None)
+
+            if state == POLL_READ:
+                loop.add_reader(fd, wake)
+                remove = loop.remove_reader
+            elif state == POLL_WRITE:
+                loop.add_writer(fd, wake)
+                remove = loop.remove_writer
+            else:
+                raise psycopg2.OperationalError(f"Unexpected poll state {state}")
+            try:
+                await ready
+            finally:
+                remove(fd)
+
+    def execute(self, sql, params=()):
+        # One autocommit connection per process for everything but LISTEN,
+        # reconnected once if the server dropped it.
+        with self.send_lock:
+            for retry in (True, False):
+                try:
+                    if self.send_connection is None or self.send_connection.closed:
+                        self.send_connection = self.connect()
+                    with self.send_connection.cursor() as cursor:
+                        if not self.tables_ready:
+                            self.create_tables(cursor)
+                        cursor.execute(sql, params)
+                        return cursor.fetchall() if cursor.description else []
+                except psycopg2.OperationalError:
+                    self.send_connection = None
+                    if not retry:
+                        raise
+
+    async def run(self, sql, params=()):
+        return await asyncio.to_thread(self.execute, sql, params)
+
+    def create_tables(self, cursor):
+        try:
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE IF NOT EXISTS {self.group_table} ("
+                "group_name varchar(100) NOT NULL, "
+                "channel_name varchar(100) NOT NULL, "
+                "expires_at timestamptz NOT NULL, "
+                "PRIMARY KEY (group_name, channel_name))"
+            )
+            cursor.execute(
+                f"CREATE UNLOGGED TABLE IF NOT EXISTS {self.message_table} ("
+                "id bigserial PRIMARY KEY, "
+                "payload text NOT NULL, "
+                "expires_at timestamptz NOT NULL)"
+            )
+        except psycopg2.IntegrityError:
+            # Another process created them at the same moment.
+            pass
+        self.tables_ready = True
+
+    async def close(self):
+        if self.listen_connection is not None:
+            self.listen_loop.remove_reader(self.listen_fd)
+            self.listen_connection.close()
+            self.listen_connection = None
+            self.listening = set()
+        await asyncio.to_thread(self.close_send_connection)
+
+    def close_send_connection(self):
+        with self.send_lock:
+            if self.send_connection is not None:
+                self.send_connection.close()
+                self.send_connection = None
+
+    # Listening --------------------------------------------------------------
+
+    def pg_channel(self, channel):
+        # Process-specific channels of one layer instance share their
+        # non-local name, and so one Postgres channel.
+        digest = hashlib.md5(self.non_local_name(channel).encode()).hexdigest()
+        return f"{self.prefix}_{digest[:24]}"
+
+    async def listen(self, pg_channel):
+        if pg_channel in self.listening:
+            return
+        if self.listen_lock is None:
+            self.listen_lock = asyncio.Lock()
+        async with self.listen_lock:
+            if self.listen_connection is None:
+                connection = self.connect(async_=True)
+                try:
+                    await self.wait(connection)
+                except BaseException:
+                    connection.close()
+                    raise
+                self.listen_connection = connection
+                self.listen_fd = connection.fileno()
+                self.listen_loop = asyncio.get_running_loop()
+                self.listen_loop.add_reader(self.listen_fd, self.read_notifies)
+            if pg_channel not in self.listening:
+                # wait() needs the socket to itself while LISTEN runs;
+                # notifies arriving meanwhile are queued by poll().
+                self.listen_loop.remove_reader(self.listen_fd)
+                try:
+                    cursor = self.listen_connection.cursor()
+                    cursor.execute(f'LISTEN "{pg_channel}"')
+                    await self.wait(self.listen_connection)
+                    cursor.close()
+                finally:
+                    self.listen_loop.add_reader(self.listen_fd, self.read_notifies)
+                self.listening.add(pg_channel)
+            self.read_notifies()
+
+    def read_notifies(self):
+        try:
+            self.listen_connection.poll()
+        except psycopg2.OperationalError:
+            self.listen_loop.create_task(self.reconnect())
+            return
+        notifies = self.listen_connection.notifies
+        while notifies:
+            data = json.loads(notifies.pop(0).payload)
+            if "id" in data:
+                self.listen_loop.create_task(self.fetch_stored(data["id"]))
+            else:
+                self.dispatch(data)
+
+    async def fetch_stored(self, message_id):
+        rows = await self.run(
+            f"SELECT payload FROM {self.message_table} WHERE id = %s", [message_id]
+        )
+        if rows:
+            self.dispatch(json.loads(rows[0][0]))
+
+    async def reconnect(self):
+        self.listen_loop.remove_reader(self.listen_fd)
+        pg_channels = self.listening
+        self.listen_connection = None
+        self.listening = set()
+        while True:
+            try:
+                for pg_channel in pg_channels:
+                    await self.listen(pg_channel)
+                return
+            except psycopg2.OperationalError:
+                if self.listen_connection is not None:
+                    self.listen_loop.remove_reader(self.listen_fd)
+                self.listen_connection = None
+                self.listening = set()
+                await asyncio.sleep(1)
+
+    def dispatch(self, data):
+        if data["expires"] < time.time():
+            return
+        for channel in data["channels"]:
+            queue = self.channels.setdefault(channel, asyncio.Queue())
+            # Senders live in other processes, so a full channel can't raise
+            # ChannelFull for them; the message is dropped instead.
+            if queue.qsize() < self.get_capacity(channel):
+                queue.put_nowait((data["expires"], dict(data["message"])))
+
+    # Channel layer API ------------------------------------------------------
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+        await self.deliver([channel], message)
+
+    async def deliver(self, channels, message):
+        # One NOTIFY per Postgres channel, naming every target channel behind it.
+        targets = defaultdict(list)
+        for channel in channels:
+            targets[self.pg_channel(channel)].append(channel)
+        expires = time.time() + self.expiry
+        await asyncio.to_thread(self.notify, targets, message, expires)
+
+    def notify(self, targets, message, expires):
+        for pg_channel, channels in targets.items():
+            payload = json.dumps(
+                {"channels": channels, "expires": expires, "message": message},
+                cls=DjangoJSONEncoder,
+            )
+            if len(payload.encode()) >= self.NOTIFY_LIMIT:
+                self.execute(
+                    f"DELETE FROM {self.message_table} WHERE expires_at < now()"
+                )
+                rows = self.execute(
+                    f"INSERT INTO {self.message_table} (payload, expires_at) "
+                    "VALUES (%s, to_timestamp(%s)) RETURNING id",
+                    [payload, expires],
+                )
+                payload = json.dumps({"id": rows[0][0]})
+            self.execute("SELECT pg_notify(%s, %s)", [pg_channel, payload])
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        self.clean_expired()
+        queue = self.channels.setdefault(channel, asyncio.Queue())
+        await self.listen(self.pg_channel(channel))
+
+        try:
+            _, message = await queue.get()
+        finally:
+            if queue.empty() and self.channels.get(channel) is queue:
+                del self.channels[channel]
+        return message
+
+    async def new_channel(self, prefix="specific"):
+        channel = f"{prefix}.{self.client_prefix}!{uuid.uuid4().hex}"
+        await self.listen(self.pg_channel(channel))
+        return channel
+
+    def clean_expired(self):
+        now = time.time()
+        for channel, queue in list(self.channels.items()):
+            while not queue.empty() and queue._queue[0][0] < now:
+                queue.get_nowait()
+            if queue.empty():
+                del self.channels[channel]
+
+    # Groups extension -------------------------------------------------------
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        await self.run(
+            f"INSERT INTO {self.group_table} (group_name, channel_name, expires_at) "
+            "VALUES (%s, %s, now() + %s * interval '1 second') "
+            "ON CONFLICT (group_name, channel_name) "
+            "DO UPDATE SET expires_at = EXCLUDED.expires_at",
+            [group, channel, self.group_expiry],
+        )
+
+    async def group_discard(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        await self.run(
+            f"DELETE FROM {self.group_table} "
+            "WHERE group_name = %s AND channel_name = %s",
+            [group, channel],
+        )
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_group_name(group), "Group name not valid"
+        rows = await self.run(
+            f"WITH expired AS (DELETE FROM {self.group_table} "
+            "WHERE group_name = %s AND expires_at <= now()) "
+            f"SELECT channel_name FROM {self.group_table} "
+            "WHERE group_name = %s AND expires_at > now()",
+            [group, group],
+        )
+        if rows:
+            await self.deliver([channel for channel, in rows], message)
+
+    # Flush extension --------------------------------------------------------
+
+    async def flush(self):
+        self.channels = {}
+        await self.run(f"TRUNCATE {self.group_table}, {self.message_table}")
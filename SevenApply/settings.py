@@ -98,7 +98,20 @@ TEMPLATE_DIRS = (os.path.join(BASE_DIR, "templates"),)
 # WSGI_APPLICATION = "SevenApply.wsgi.application"
 ASGI_APPLICATION = "SevenApply.asgi.application"
 
-CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+# "postgres" shares websocket groups between ASGI workers through the database;
+# the in-memory layer only reaches sockets of the same process.
+CHANNEL_LAYER = env("CHANNEL_LAYER", "memory")
+
+if CHANNEL_LAYER == "postgres":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "SevenApply.channels_postgres.PostgresChannelLayer",
+            # Consumers re-join their groups on every presence heartbeat.
+            "CONFIG": {"group_expiry": 300},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
 
 DATABASES = {
     "default": dj_database_url.config(
@@ -204,3 +217,41 @@ DEBUG_TOOLBAR_CONFIG = {
 }
 
 AUTH_USER_MODEL = "core.User"
+
+
+# Landing page snapshot
+
+LANDING_SNAPSHOT_REFRESH_INTERVAL = 60  # seconds before a background rebuild
+LANDING_SNAPSHOT_MAX_AGE = 300  # seconds before a snapshot is never served
+LANDING_SNAPSHOT_DEBOUNCE = 5  # seconds to batch model changes into one rebuild
+LANDING_SNAPSHOT_BUILD_TIMEOUT = 60  # seconds a request may hold the build lock
+LANDING_SNAPSHOT_COLD_WAIT = 3  # seconds others wait for it before a minimal page
+LANDING_POSITION_POOL_SIZE = 40
+LANDING_UNIVERSITY_POOL_SIZE = 60
+
+
+# Notifications
+
+NOTIFICATION_FANOUT_CHUNK_SIZE = 500  # students notified per bulk insert
+NOTIFICATION_RETENTION_DAYS = 90  # read, unbookmarked ones are pruned after this
+NEW_POSITION_NOTIFY_WINDOW = 600  # seconds in which a new position's tags notify
+NOTIFICATION_REPLAY_LIMIT = 100  # missed notifications sent on reconnect
+
+
+# Websocket presence, used to skip pushes to users with no open socket. It is
+# kept in the default cache, so it is only trusted while every socket lives in
+# the pushing process; use a shared cache before enabling it with other layers.
+
+PRESENCE_TRACKING = env("PRESENCE_TRACKING", str(CHANNEL_LAYER == "memory")) == "True"
+PRESENCE_TIMEOUT = 90  # seconds a socket counts as open without a heartbeat
+PRESENCE_HEARTBEAT_INTERVAL = 30
+
+
+# Outbox
+
+# Also drain each event in the web process right after its commit, instead of
+# only in `manage.py run_outbox`. Keep this on with the in-memory channel
+# layer: a separate dispatcher process can't reach this process's websockets.
+# Events the web process fails to handle are retried by `run_outbox`.
+OUTBOX_EAGER = env("OUTBOX_EAGER", str(CHANNEL_LAYER == "memory")) == "True"
+OUTBOX_MAX_ATTEMPTS = 10
@@ -1,5 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.http import JsonResponse
+from django.urls import path
+from django.utils.dateparse import parse_date
 
 from .models import *
 
@@ -25,3 +28,39 @@ class UserAdmin(BaseUserAdmin):
             },
         ),
     )
+
+
+@admin.register(DailySignup)
+class DailySignupAdmin(admin.ModelAdmin):
+    list_display = ["day", "count"]
+    ordering = ["-day"]
+    date_hierarchy = "day"
+
+    def get_urls(self):
+        return [
+            path(
+                "series/",
+                self.admin_site.admin_view(self.series_view),
+                name="core_dailysignup_series",
+            ),
+        ] + super().get_urls()
+
+    def series_view(self, request):
+        bucket = request.GET.get("bucket", "day")
+        if bucket not in DailySignup.objects.BUCKETS:
+            buckets = list(DailySignup.objects.BUCKETS)
+            return JsonResponse(
+                {"detail": f"bucket must be one of {buckets}."},
+                status=400,
+            )
+        start = parse_date(request.GET.get("start", "") or "")
+        end = parse_date(request.GET.get("end", "") or "")
+        series = DailySignup.objects.histogram(start, end, bucket)
+        return JsonResponse(
+            {
+                "bucket": bucket,
+                "series": [
+                    {"start": row["bucket"], "count": row["count"]} for row in series
+                ],
+            }
+        )
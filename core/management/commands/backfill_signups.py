@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from core.models import DailySignup, User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily signup rollup from User.date_joined."
+
+    def handle(self, *args, **options):
+        days = (
+            User.objects.annotate(day=TruncDate("date_joined"))
+            .values("day")
+            .annotate(count=Count("id"))
+            .order_by("day")
+        )
+
+        with transaction.atomic():
+            DailySignup.objects.all().delete()
+            rows = DailySignup.objects.bulk_create(
+                DailySignup(day=row["day"], count=row["count"]) for row in days
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt signup rollup with {len(rows)} days.")
+        )
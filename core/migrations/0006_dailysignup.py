@@ -0,0 +1,36 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:10
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_signups(apps, schema_editor):
+    User = apps.get_model("core", "User")
+    DailySignup = apps.get_model("core", "DailySignup")
+    days = (
+        User.objects.annotate(day=TruncDate("date_joined"))
+        .values("day")
+        .annotate(count=Count("id"))
+    )
+    DailySignup.objects.bulk_create(
+        DailySignup(day=row["day"], count=row["count"]) for row in days
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_user_is_student"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySignup",
+            fields=[
+                ("day", models.DateField(primary_key=True, serialize=False)),
+                ("count", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_signups, migrations.RunPython.noop),
+    ]
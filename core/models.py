@@ -1,5 +1,14 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import (
+    Coalesce,
+    TruncDay,
+    TruncMonth,
+    TruncQuarter,
+    TruncWeek,
+    TruncYear,
+)
 
 # Create your models here.
 
@@ -19,7 +28,7 @@ class UserManager(BaseUserManager):
         extra_fields.setdefault("is_staff", False)
         extra_fields.setdefault("is_superuser", False)
         return self._create_user(email, password, **extra_fields)
-    
+
     def create_superuser(self, email, password=None, **extra_fields):
         extra_fields.setdefault("is_staff", True)
         extra_fields.setdefault("is_superuser", True)
@@ -45,4 +54,58 @@ class User(AbstractUser):
     def __str__(self) -> str:
         return self.email
 
-    
\ No newline at end of file
+
+class DailySignupManager(models.Manager):
+    BUCKETS = {
+        "day": TruncDay,
+        "week": TruncWeek,
+        "month": TruncMonth,
+        "quarter": TruncQuarter,
+        "year": TruncYear,
+    }
+
+    def record(self, day):
+        with transaction.atomic():
+            if self.filter(day=day).update(count=F("count") + 1):
+                return
+            try:
+                with transaction.atomic():
+                    self.create(day=day, count=1)
+            except IntegrityError:
+                self.filter(day=day).update(count=F("count") + 1)
+
+    def forget(self, day):
+        # A day without signups has no row to take one away from.
+        self.filter(day=day, count__gt=0).update(count=F("count") - 1)
+
+    def cumulative_counts(self, days):
+        totals = self.aggregate(
+            **{
+                f"until_{i}": Coalesce(Sum("count", filter=Q(day__lte=day)), 0)
+                for i, day in enumerate(days)
+            }
+        )
+        return [totals[f"until_{i}"] for i in range(len(days))]
+
+    def histogram(self, start=None, end=None, bucket="day"):
+        queryset = self.all()
+        if start is not None:
+            queryset = queryset.filter(day__gte=start)
+        if end is not None:
+            queryset = queryset.filter(day__lte=end)
+        return (
+            queryset.annotate(bucket=self.BUCKETS[bucket]("day"))
+            .values("bucket")
+            .annotate(count=Sum("count"))
+            .order_by("bucket")
+        )
+
+
+class DailySignup(models.Model):
+    day = models.DateField(primary_key=True)
+    count = models.IntegerField(default=0)
+
+    objects = DailySignupManager()
+
+    def __str__(self) -> str:
+        return f"{self.day}: {self.count}"
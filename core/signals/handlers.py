@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import DailySignup, User
+
+
+@receiver(post_save, sender=User)
+def record_signup(sender, instance, created, **kwargs):
+    if created:
+        DailySignup.objects.record(timezone.localdate(instance.date_joined))
+
+
+@receiver(post_delete, sender=User)
+def forget_signup(sender, instance, **kwargs):
+    DailySignup.objects.forget(timezone.localdate(instance.date_joined))
@@ -1,3 +1,24 @@
+import datetime
+
 from django.test import TestCase
 
+from .models import DailySignup
+
 # Create your tests here.
+
+
+class DailySignupTests(TestCase):
+    day = datetime.date(2024, 1, 1)
+
+    def test_forget_without_signups_creates_nothing(self):
+        DailySignup.objects.forget(self.day)
+
+        self.assertFalse(DailySignup.objects.filter(day=self.day).exists())
+
+    def test_forget_never_goes_below_zero(self):
+        DailySignup.objects.record(self.day)
+
+        DailySignup.objects.forget(self.day)
+        DailySignup.objects.forget(self.day)
+
+        self.assertEqual(DailySignup.objects.get(day=self.day).count, 0)
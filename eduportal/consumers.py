@@ -1,11 +1,51 @@
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from ticketing_system.models import ChatSystem
+from urllib.parse import parse_qs
+from .models import Notification
+from .serializers import NotificationSerializer
+from .utils import presence
+import asyncio
 import json
+import logging
 
 
-class NotificationConsumer(AsyncWebsocketConsumer):
+logger = logging.getLogger(__name__)
+
+
+class PresenceMixin:
+    async def join_presence(self):
+        await presence.connected(self.group_name)
+        self.heartbeat_task = asyncio.create_task(self.send_heartbeats())
+
+    async def leave_presence(self):
+        if hasattr(self, "heartbeat_task"):
+            self.heartbeat_task.cancel()
+            await presence.disconnected(self.group_name)
+
+    async def send_heartbeats(self):
+        # A failed beat is retried at the next interval; ending the loop would
+        # let the group membership expire under a socket that stays open.
+        while True:
+            await asyncio.sleep(settings.PRESENCE_HEARTBEAT_INTERVAL)
+            results = await asyncio.gather(
+                presence.heartbeat(self.group_name),
+                # Refreshes the membership on layers that expire it.
+                self.channel_layer.group_add(self.group_name, self.channel_name),
+                return_exceptions=True,
+            )
+            for error in results:
+                if isinstance(error, Exception):
+                    logger.error(
+                        "Heartbeat for %s failed", self.group_name, exc_info=error
+                    )
+
+
+class NotificationConsumer(PresenceMixin, AsyncWebsocketConsumer):
+    replayed_ids = frozenset()
+
     async def connect(self):
         self.user_id = self.scope["user"].id
         if not self.user_id:
@@ -15,6 +55,36 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.group_name, self.channel_name)
 
         await self.accept()
+        await self.join_presence()
+        await self.replay_missed()
+
+    async def replay_missed(self):
+        # With ?since=<last seen notification id>, first sends what arrived
+        # while the client was away. The group was joined before the query,
+        # so live events repeating replayed ids are skipped afterwards. Ids
+        # aren't committed in order, so a live event with a lower id than the
+        # last replayed one may still be new.
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            since = int(query["since"][0])
+        except (KeyError, ValueError):
+            return
+        messages, has_more = await self.get_notifications_since(since)
+        self.replayed_ids = {message["id"] for message in messages}
+        await self.send(
+            text_data=json.dumps({"notifications": messages, "has_more": has_more})
+        )
+
+    @database_sync_to_async
+    def get_notifications_since(self, since):
+        limit = settings.NOTIFICATION_REPLAY_LIMIT
+        notifications = list(
+            Notification.objects.filter(user_id=self.user_id, id__gt=since).order_by(
+                "id"
+            )[: limit + 1]
+        )
+        messages = NotificationSerializer(notifications[:limit], many=True).data
+        return messages, len(notifications) > limit
 
     async def disconnect(self, close_code):
         if hasattr(self, "group_name"):
@@ -22,6 +92,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
                 self.group_name,
                 self.channel_name,
             )
+        await self.leave_presence()
 
     async def receive(self, text_data):
         pass
@@ -30,7 +101,15 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         print("send_notification:\t\tDebug:\t\tStarting sending of ws message.")
 
         try:
-            message = event["message"]
+            # Several notifications committed together arrive as one batch.
+            messages = event.get("messages") or [event["message"]]
+            messages = [m for m in messages if m["id"] not in self.replayed_ids]
+            if not messages:
+                return
+            if len(messages) == 1:
+                message = messages[0]
+            else:
+                message = {"notifications": messages}
             print("send_notification:\t\tDebug:\t\tRetrieved event message.")
             message_data = json.dumps(message)
             print("send_notification:\t\tDebug:\t\tRetrieved message data json.")
@@ -41,7 +120,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             print(f"send_notification:\t\tDebug:\t\t{e}")
 
 
-class ChatConsumer(AsyncWebsocketConsumer):
+class ChatConsumer(PresenceMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.group_id = self.scope["url_route"]["kwargs"]["group_id"]
         self.group_name = f"chat_{self.group_id}"
@@ -49,9 +128,14 @@ class ChatConsumer(AsyncWebsocketConsumer):
         if await self.is_group_member():
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
+            await self.join_presence()
         else:
             await self.close()
 
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        await self.leave_presence()
+
     @database_sync_to_async
     def is_group_member(self):
         user = self.scope["user"]
@@ -1,67 +1,64 @@
 from django_filters import rest_framework as filters
-from .models import Position, Request
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
 
+from .models import Position, PositionQuerySet, Request
+from .utils import search
+from .utils.field_choices import SeasonChoices
 
-class ProfessorOwnPositionFilter(filters.FilterSet):
+
+POSITION_STATUS_CHOICES = [
+    ("open", PositionQuerySet.OPEN),
+    ("closed", PositionQuerySet.CLOSED),
+    ("inactive", PositionQuerySet.INACTIVE),
+]
+
+
+def season_from_term(term):
+    try:
+        return SeasonChoices[term.upper()]
+    except KeyError:
+        return None
+
+
+class BasePositionFilter(filters.FilterSet):
     term = filters.CharFilter(method="filter_by_season")
+    status = filters.ChoiceFilter(
+        choices=POSITION_STATUS_CHOICES, method="filter_by_status"
+    )
+    position_start_date__year__exact = filters.NumberFilter(field_name="start_year")
+
+    def filter_by_season(self, queryset, name, value):
+        season = season_from_term(value)
+        if season is None:
+            return queryset.none()
+        return queryset.filter(season=season)
+
+    def filter_by_status(self, queryset, name, value):
+        return queryset.filter_status(dict(POSITION_STATUS_CHOICES)[value])
+
+
+class ProfessorOwnPositionFilter(BasePositionFilter):
     # fee = filters.NumberFilter()
     # fee__gte = filters.NumberFilter(field_name="fee", lookup_expr="gte")
     # fee__lte = filters.NumberFilter(field_name="fee", lookup_expr="lte")
 
     class Meta:
         model = Position
-        fields = {"fee": ["lte", "gte"], "position_start_date": ["year__exact"]}
-
-    def filter_by_season(self, queryset, name, value):
-        if value.lower() == "summer":
-            return queryset.filter(
-                position_start_date__month__gte=6, position_start_date__month__lte=9
-            )
-        elif value.lower() == "winter":
-            return queryset.filter(
-                position_start_date__month__gte=10, position_start_date__month__lte=12
-            )
-        elif value.lower() == "spring":
-            return queryset.filter(
-                position_start_date__month__gte=1, position_start_date__month__lte=5
-            )
-        elif value is None:
-            return queryset
-        else:
-            return queryset.none()
+        fields = {"fee": ["lte", "gte"]}
 
 
-class ProfessorOtherPositionFilter(filters.FilterSet):
-    term = filters.CharFilter(method="filter_by_season")
+class ProfessorOtherPositionFilter(BasePositionFilter):
     # fee = filters.NumberFilter()
     # fee__gte = filters.NumberFilter(field_name="fee", lookup_expr="gte")
     # fee__lte = filters.NumberFilter(field_name="fee", lookup_expr="lte")
 
     class Meta:
         model = Position
-        fields = {"fee": ["lte", "gte"], "position_start_date": ["year__exact"]}
-
-    def filter_by_season(self, queryset, name, value):
-        if value.lower() == "summer":
-            return queryset.filter(
-                position_start_date__month__gte=6, position_start_date__month__lte=9
-            )
-        elif value.lower() == "winter":
-            return queryset.filter(
-                position_start_date__month__gte=10, position_start_date__month__lte=12
-            )
-        elif value.lower() == "spring":
-            return queryset.filter(
-                position_start_date__month__gte=1, position_start_date__month__lte=5
-            )
-        elif value is None:
-            return queryset
-        else:
-            return queryset.none()
+        fields = {"fee": ["lte", "gte"]}
 
 
-class StudentPositionFilter(filters.FilterSet):
-    term = filters.CharFilter(method="filter_by_season")
+class StudentPositionFilter(BasePositionFilter):
     # fee = filters.NumberFilter()
     # fee__gte = filters.NumberFilter(field_name="fee", lookup_expr="gte")
     # fee__lte = filters.NumberFilter(field_name="fee", lookup_expr="lte")
@@ -70,37 +67,16 @@ class StudentPositionFilter(filters.FilterSet):
         model = Position
         fields = {
             "fee": ["lte", "gte"],
-            "position_start_date": ["year__exact"],
             "filled": ["exact"],
         }
 
-    def filter_by_season(self, queryset, name, value):
-        if value.lower() == "summer":
-            return queryset.filter(
-                position_start_date__month__gte=6, position_start_date__month__lte=9
-            )
-        elif value.lower() == "winter":
-            return queryset.filter(
-                position_start_date__month__gte=10, position_start_date__month__lte=12
-            )
-        elif value.lower() == "spring":
-            return queryset.filter(
-                position_start_date__month__gte=1, position_start_date__month__lte=5
-            )
-        elif value is None:
-            return queryset
-        else:
-            return queryset.none()
-
 
 class StudentRequestFilter(filters.FilterSet):
     term = filters.CharFilter(method="filter_by_season")
     status = filters.CharFilter(method="filter_by_status")
     fee__lte = filters.NumberFilter(field_name="position__fee", lookup_expr="lte")
     fee__gte = filters.NumberFilter(field_name="position__fee", lookup_expr="gte")
-    year = filters.NumberFilter(
-        field_name="position__position_start_date__year", lookup_expr="exact"
-    )
+    year = filters.NumberFilter(field_name="position__start_year")
 
     class Meta:
         model = Request
@@ -116,28 +92,42 @@ class StudentRequestFilter(filters.FilterSet):
         return queryset.none()
 
     def filter_by_season(self, queryset, name, value):
-        if value.lower() == "summer":
-            return queryset.filter(
-                position__position_start_date__month__gte=6,
-                position__position_start_date__month__lte=9,
-            )
-        elif value.lower() == "winter":
-            return queryset.filter(
-                position__position_start_date__month__gte=10,
-                position__position_start_date__month__lte=12,
-            )
-        elif value.lower() == "spring":
-            return queryset.filter(
-                position__position_start_date__month__gte=1,
-                position__position_start_date__month__lte=5,
-            )
-        elif value is None:
-            return queryset
-        else:
+        season = season_from_term(value)
+        if season is None:
             return queryset.none()
+        return queryset.filter(position__season=season)
 
 
 class ProfessorRequestFilter(filters.FilterSet):
     class Meta:
         model = Request
-        fields = ["status", "student__major"]
+        fields = ["status", "student__major", "position"]
+
+
+class PositionSearchFilter(BaseFilterBackend):
+    # Views may narrow matching with `search_document_fields`.
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "")
+        if not query.strip():
+            return queryset
+        explicitly_ordered = bool(request.query_params.get(self.ordering_param))
+        return search.search_positions(
+            queryset,
+            query,
+            order_by_rank=not explicitly_ordered,
+            fields=getattr(view, "search_document_fields", None),
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.search_param,
+                "required": False,
+                "in": "query",
+                "description": "Full-text search terms, ranked by relevance.",
+                "schema": {"type": "string"},
+            },
+        ]
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from eduportal.models import Notification, NotificationItem
+from eduportal.utils.notifications import batched_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete read, unbookmarked notifications older than the retention period "
+        "and the notification items no notification refers to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.NOTIFICATION_RETENTION_DAYS,
+            help="Keep notifications newer than this many days.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        cutoff = timezone.now() - timedelta(days=options["days"])
+
+        expired = Notification.objects.filter(
+            read=True, bookmarked=False, timestamp__lt=cutoff
+        )
+        notifications = self.delete_in_batches(
+            expired, batch_size, self.delete_notifications
+        )
+
+        orphans = NotificationItem.objects.filter(notifications__isnull=True)
+        items = self.delete_in_batches(
+            orphans, batch_size, lambda batch: batch.delete()[0]
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {notifications} notifications and {items} notification items."
+            )
+        )
+
+    def delete_in_batches(self, queryset, batch_size, delete):
+        # Short transactions over primary-key chunks; an interrupted run is
+        # resumed by running the command again.
+        last_id = 0
+        total = 0
+
+        while True:
+            ids = list(
+                queryset.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                total += delete(queryset.filter(pk__in=ids))
+            last_id = ids[-1]
+        return total
+
+    def delete_notifications(self, batch):
+        # The post_delete receiver updates the counters; the rows are locked
+        # first so a concurrent delete can't count them twice.
+        with batched_counters():
+            ids = list(batch.select_for_update().values_list("pk", flat=True))
+            deleted = Notification.objects.filter(pk__in=ids).delete()[1]
+        return deleted.get(Notification._meta.label, 0)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from eduportal.models import Professor, Student
+from eduportal.utils import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Recompute the leaderboard scores of every professor and student."
+
+    def handle(self, *args, **options):
+        professors = leaderboard.refresh_professors(Professor.objects.all())
+        students = leaderboard.refresh_students(Student.objects.all())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {professors} professors and {students} students."
+            )
+        )
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from eduportal.models import Notification
+from eduportal.serializers import NOTIFICATION_PAYLOAD_VERSION, notification_payload
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored payloads of notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every payload, not only missing or outdated ones.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        notifications = Notification.objects.all()
+        if not options["all"]:
+            notifications = notifications.filter(
+                Q(payload__isnull=True)
+                | Q(payload_version__lt=NOTIFICATION_PAYLOAD_VERSION)
+            )
+        last_id = 0
+        total = 0
+
+        while True:
+            batch = list(
+                notifications.filter(pk__gt=last_id)
+                .order_by("pk")
+                .prefetch_related("items__content_object")[:batch_size]
+            )
+            if not batch:
+                break
+
+            # Notifications about the same objects share one payload.
+            payloads = {}
+            for notification in batch:
+                items = notification.items.all()
+                key = tuple(
+                    sorted((item.content_type_id, item.object_id) for item in items)
+                )
+                if key not in payloads:
+                    payloads[key] = notification_payload(
+                        *[item.content_object for item in items]
+                    )
+                notification.payload = payloads[key]["payload"]
+                notification.payload_version = payloads[key]["payload_version"]
+
+            Notification.objects.bulk_update(batch, ["payload", "payload_version"])
+            total += len(batch)
+            last_id = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} notification payloads."))
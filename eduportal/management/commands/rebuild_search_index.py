@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from eduportal.models import Position
+from eduportal.utils import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of every position."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id = 0
+        total = 0
+
+        while True:
+            ids = list(
+                Position.objects.filter(pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            total += search.index_positions(Position.objects.filter(pk__in=ids))
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} positions."))
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from eduportal.models import Notification, NotificationCounter
+from eduportal.utils.notifications import count_by_user
+
+
+class Command(BaseCommand):
+    help = "Recount the notification counters of every user and fix any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        users = get_user_model().objects.order_by("pk")
+        last_id = 0
+        fixed = 0
+
+        while True:
+            ids = list(
+                users.filter(pk__gt=last_id).values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                fixed += self.reconcile(ids)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} notification counters."))
+
+    def reconcile(self, user_ids):
+        actual = count_by_user(Notification.objects.filter(user_id__in=user_ids))
+        counters = NotificationCounter.objects.select_for_update().in_bulk(user_ids)
+
+        created = []
+        updated = []
+        for user_id in user_ids:
+            total, unread = actual.get(user_id, (0, 0))
+            counter = counters.get(user_id)
+            if counter is None:
+                if total:
+                    created.append(
+                        NotificationCounter(user_id=user_id, total=total, unread=unread)
+                    )
+            elif (counter.total, counter.unread) != (total, unread):
+                counter.total, counter.unread = total, unread
+                updated.append(counter)
+
+        NotificationCounter.objects.bulk_create(created)
+        NotificationCounter.objects.bulk_update(updated, ["total", "unread"])
+        return len(created) + len(updated)
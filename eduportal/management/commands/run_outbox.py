@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from eduportal.utils import outbox
+
+
+class Command(BaseCommand):
+    help = "Run the handlers of pending outbox events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when there are no pending events.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no events are pending.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        while True:
+            handled, failed = outbox.dispatch(batch_size)
+            if handled or failed:
+                self.stdout.write(f"Handled {handled} events, {failed} failed.")
+            if handled + failed < batch_size:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS("No pending events."))
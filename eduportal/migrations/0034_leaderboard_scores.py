@@ -0,0 +1,116 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset, group_by):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def backfill_scores(apps, schema_editor):
+    Professor = apps.get_model("eduportal", "Professor")
+    Student = apps.get_model("eduportal", "Student")
+    Request = apps.get_model("eduportal", "Request")
+    ProjectExperience = apps.get_model("eduportal", "ProjectExperience")
+    EducationHistory = apps.get_model("eduportal", "EducationHistory")
+
+    Professor.objects.update(
+        accepted_request_count=count_of(
+            Request.objects.filter(position__professor=OuterRef("pk"), status="SA"),
+            "position__professor",
+        ),
+        project_count=count_of(
+            ProjectExperience.objects.filter(cv__professor=OuterRef("pk")), "cv"
+        ),
+    )
+    Student.objects.update(
+        accepted_request_count=count_of(
+            Request.objects.filter(
+                student=OuterRef("pk"), status__in=["PA", "SA", "SR"]
+            ),
+            "student",
+        ),
+        avg_grade=Coalesce(
+            Subquery(
+                EducationHistory.objects.filter(
+                    cv__student=OuterRef("pk"), end_date__isnull=False
+                )
+                .order_by()
+                .values("cv")
+                .annotate(average=Avg("grade"))
+                .values("average")
+            ),
+            Value(0.0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0033_professor_image_student_image"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="professor",
+            name="accepted_request_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="professor",
+            name="project_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="student",
+            name="accepted_request_count",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="student",
+            name="avg_grade",
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="professor",
+            index=models.Index(
+                fields=["-accepted_request_count", "id"],
+                name="professor_accepted_rank_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="professor",
+            index=models.Index(
+                fields=["major", "-project_count", "id"],
+                name="professor_major_project_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="student",
+            index=models.Index(
+                fields=["-accepted_request_count", "id"],
+                name="student_accepted_rank_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="student",
+            index=models.Index(
+                fields=["major", "-avg_grade", "id"],
+                name="student_major_grade_rank_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
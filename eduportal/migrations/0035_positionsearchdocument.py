@@ -0,0 +1,123 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:14
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.search import SearchVector
+from django.db import OperationalError, migrations, models
+
+
+FTS_TABLE = "eduportal_positionsearchdocument_fts"
+FIELD_WEIGHTS = [("title", "A"), ("tags", "B"), ("people", "C"), ("description", "D")]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX position_search_vector_gin "
+            "ON eduportal_positionsearchdocument USING gin (vector)"
+        )
+    elif vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                "USING fts5(title, tags, people, description)"
+            )
+        except OperationalError:
+            # SQLite built without FTS5; the search backend falls back to LIKE.
+            pass
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS position_search_vector_gin")
+    elif vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def index_positions(apps, schema_editor):
+    Position = apps.get_model("eduportal", "Position")
+    PositionSearchDocument = apps.get_model("eduportal", "PositionSearchDocument")
+    connection = schema_editor.connection
+
+    tags = {}
+    for position_id, label in Position.tags.through.objects.values_list(
+        "position_id", "tag_id"
+    ):
+        tags.setdefault(position_id, []).append(label)
+
+    documents = []
+    rows = Position.objects.values_list(
+        "id",
+        "title",
+        "description",
+        "professor__user__first_name",
+        "professor__user__last_name",
+        "professor__department",
+        "professor__university__name",
+    )
+    for position_id, title, description, *people in rows.iterator(chunk_size=500):
+        documents.append(
+            PositionSearchDocument(
+                position_id=position_id,
+                title=title,
+                tags=" ".join(tags.get(position_id, [])),
+                people=" ".join(part for part in people if part),
+                description=description,
+            )
+        )
+    PositionSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+    fields = [field for field, _ in FIELD_WEIGHTS]
+    if connection.vendor == "postgresql":
+        vector = None
+        for field, weight in FIELD_WEIGHTS:
+            field_vector = SearchVector(field, weight=weight, config="simple")
+            vector = field_vector if vector is None else vector + field_vector
+        PositionSearchDocument.objects.update(vector=vector)
+    elif connection.vendor == "sqlite":
+        if FTS_TABLE not in connection.introspection.table_names():
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(fields)}) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [
+                    [document.position_id]
+                    + [getattr(document, field) for field in fields]
+                    for document in documents
+                ],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0034_leaderboard_scores"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PositionSearchDocument",
+            fields=[
+                (
+                    "position",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="eduportal.position",
+                    ),
+                ),
+                ("title", models.TextField()),
+                ("tags", models.TextField(blank=True)),
+                ("people", models.TextField(blank=True)),
+                ("description", models.TextField(blank=True)),
+                ("vector", django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_positions, migrations.RunPython.noop),
+    ]
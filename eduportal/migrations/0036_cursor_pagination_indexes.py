@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0035_positionsearchdocument"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "-id"], name="notification_user_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="position_recent_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0036_cursor_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                condition=models.Q(("filled__lt", models.F("capacity"))),
+                fields=["end_date", "start_date"],
+                name="position_open_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:24
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+from django.db.models.functions import ExtractYear
+
+
+def backfill_terms(apps, schema_editor):
+    Position = apps.get_model("eduportal", "Position")
+    Position.objects.update(
+        season=Case(
+            When(position_start_date__month__lte=5, then=Value(1)),
+            When(position_start_date__month__lte=9, then=Value(2)),
+            default=Value(3),
+        ),
+        start_year=ExtractYear("position_start_date"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0037_position_open_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="position",
+            name="season",
+            field=models.PositiveSmallIntegerField(
+                choices=[(1, "Spring"), (2, "Summer"), (3, "Winter")],
+                default=1,
+                editable=False,
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="position",
+            name="start_year",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_terms, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["season", "start_year", "fee"],
+                name="position_season_year_fee_idx",
+            ),
+        ),
+    ]
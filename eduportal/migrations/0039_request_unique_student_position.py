@@ -0,0 +1,61 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:27
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# The request of a duplicated (student, position) pair that is kept is the
+# one furthest along, so an accepted request is never dropped for an older
+# rejected or pending one.
+STATUS_RANK = {"SA": 5, "PA": 4, "SP": 3, "SR": 2, "PR": 1, "PP": 0}
+SEAT_STATUSES = ("PA", "SA")
+
+
+def remove_duplicate_requests(apps, schema_editor):
+    # Deleted duplicates can't be restored: reversing this migration only
+    # drops the constraint.
+    Request = apps.get_model("eduportal", "Request")
+    Position = apps.get_model("eduportal", "Position")
+    duplicated = (
+        Request.objects.values("student", "position")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+    )
+
+    duplicates = []
+    positions = set()
+    for pair in duplicated:
+        rows = list(
+            Request.objects.filter(
+                student=pair["student"], position=pair["position"]
+            ).values_list("id", "status")
+        )
+        kept, _ = max(rows, key=lambda row: (STATUS_RANK.get(row[1], 0), -row[0]))
+        duplicates += [pk for pk, _ in rows if pk != kept]
+        positions.add(pair["position"])
+    Request.objects.filter(pk__in=duplicates).delete()
+
+    # The counters of the positions that lost requests are recounted from
+    # the requests left.
+    for position_id in positions:
+        requests = Request.objects.filter(position_id=position_id)
+        Position.objects.filter(pk=position_id).update(
+            request_count=requests.count(),
+            filled=requests.filter(status__in=SEAT_STATUSES).count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0038_position_season_start_year"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_requests, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="request",
+            constraint=models.UniqueConstraint(
+                fields=("student", "position"), name="request_unique_student_position"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0039_request_unique_student_position"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="payload",
+            field=models.JSONField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="payload_version",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+    ]
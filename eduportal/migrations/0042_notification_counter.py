@@ -0,0 +1,48 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_notifications(apps, schema_editor):
+    Notification = apps.get_model("eduportal", "Notification")
+    NotificationCounter = apps.get_model("eduportal", "NotificationCounter")
+    NotificationCounter.objects.bulk_create(
+        NotificationCounter(
+            user_id=row["user_id"], total=row["total"], unread=row["unread"]
+        )
+        for row in Notification.objects.order_by()
+        .values("user_id")
+        .annotate(total=Count("id"), unread=Count("id", filter=Q(read=False)))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_dailysignup"),
+        ("eduportal", "0041_outbox_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationCounter",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="notification_counter",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("total", models.IntegerField(default=0)),
+                ("unread", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_notifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:01
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0042_notification_counter"),
+    ]
+
+    # A column can't be altered into a generated one, so both are re-added.
+    operations = [
+        migrations.RemoveIndex(
+            model_name="position",
+            name="position_season_year_fee_idx",
+        ),
+        migrations.RemoveField(
+            model_name="position",
+            name="season",
+        ),
+        migrations.RemoveField(
+            model_name="position",
+            name="start_year",
+        ),
+        migrations.AddField(
+            model_name="position",
+            name="season",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(position_start_date__month__lte=5, then=1),
+                    models.When(position_start_date__month__lte=9, then=2),
+                    default=3,
+                ),
+                output_field=models.PositiveSmallIntegerField(
+                    choices=[(1, "Spring"), (2, "Summer"), (3, "Winter")]
+                ),
+            ),
+        ),
+        migrations.AddField(
+            model_name="position",
+            name="start_year",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.datetime.ExtractYear(
+                    "position_start_date"
+                ),
+                output_field=models.PositiveSmallIntegerField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="position",
+            index=models.Index(
+                fields=["season", "start_year", "fee"],
+                name="position_season_year_fee_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.4 on 2026-10-18 20:41
+
+import eduportal.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eduportal", "0043_position_generated_terms"),
+    ]
+
+    # Added without a default first, so existing positions don't get a
+    # notification window.
+    operations = [
+        migrations.AddField(
+            model_name="position",
+            name="notify_until",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="position",
+            name="notify_until",
+            field=models.DateTimeField(
+                default=eduportal.models.new_position_notify_until,
+                editable=False,
+                null=True,
+            ),
+        ),
+    ]
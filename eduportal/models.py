@@ -1,9 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import ExtractYear
+from django.dispatch import Signal
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_countries.fields import CountryField
 
@@ -16,6 +23,20 @@ UserModel = get_user_model()
 # Create your models here.
 
 
+class ScoreFieldsMixin:
+    # Scores are written with UPDATE statements; a plain save() of an instance
+    # loaded earlier must not overwrite them with stale values. Inserts and
+    # saves naming update_fields are left alone.
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if update_fields is None:
+            values = [
+                value for value in values if value[0].name not in self.SCORE_FIELDS
+            ]
+        return super()._do_update(
+            base_qs, using, pk_val, values, update_fields, forced_update
+        )
+
+
 class StudentImage(models.Model):
     image = models.ImageField(upload_to="images/student_images")
 
@@ -56,7 +77,7 @@ class University(models.Model):
         super().save(*args, **kwargs)
 
 
-class Student(models.Model):
+class Student(ScoreFieldsMixin, models.Model):
     GENDER = [
         ("M", "Male"),
         ("F", "Female"),
@@ -89,12 +110,30 @@ class Student(models.Model):
         "NotificationItem", related_query_name="student"
     )
 
+    # Leaderboard scores, maintained by eduportal.utils.leaderboard
+    accepted_request_count = models.IntegerField(default=0, editable=False)
+    avg_grade = models.FloatField(default=0.0, editable=False)
+
+    SCORE_FIELDS = ("accepted_request_count", "avg_grade")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-accepted_request_count", "id"],
+                name="student_accepted_rank_idx",
+            ),
+            models.Index(
+                fields=["major", "-avg_grade", "id"],
+                name="student_major_grade_rank_idx",
+            ),
+        ]
+
     def delete(self, *args, **kwargs):
         self.image.delete()
         super().delete(*args, **kwargs)
 
 
-class Professor(models.Model):
+class Professor(ScoreFieldsMixin, models.Model):
     user = models.OneToOneField(UserModel, on_delete=models.CASCADE)
     university = models.ForeignKey(
         University, models.SET_NULL, blank=True, null=True, related_name="professors"
@@ -109,6 +148,24 @@ class Professor(models.Model):
         blank=True,
     )
 
+    # Leaderboard scores, maintained by eduportal.utils.leaderboard
+    accepted_request_count = models.IntegerField(default=0, editable=False)
+    project_count = models.IntegerField(default=0, editable=False)
+
+    SCORE_FIELDS = ("accepted_request_count", "project_count")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["-accepted_request_count", "id"],
+                name="professor_accepted_rank_idx",
+            ),
+            models.Index(
+                fields=["major", "-project_count", "id"],
+                name="professor_major_project_idx",
+            ),
+        ]
+
     def delete(self, *args, **kwargs):
         self.image.delete()
         super().delete(*args, **kwargs)
@@ -139,6 +196,71 @@ class Tag2(models.Model):
         return self.get_label_display()
 
 
+class PositionQuerySet(models.QuerySet):
+    OPEN = "Open"
+    CLOSED = "Closed"
+    INACTIVE = "Not Active"
+
+    def with_status(self, today=None):
+        today = today or timezone.now().date()
+        return self.annotate(
+            status=models.Case(
+                models.When(start_date__gt=today, then=models.Value(self.INACTIVE)),
+                models.When(
+                    filled__gte=models.F("capacity"), then=models.Value(self.CLOSED)
+                ),
+                models.When(end_date__lt=today, then=models.Value(self.CLOSED)),
+                default=models.Value(self.OPEN),
+                output_field=models.CharField(),
+            )
+        )
+
+    def filter_status(self, value, today=None):
+        # Filters on the underlying columns rather than the annotation so the
+        # database can use position_open_idx.
+        today = today or timezone.now().date()
+        if value == self.OPEN:
+            return self.filter(
+                start_date__lte=today,
+                end_date__gte=today,
+                filled__lt=models.F("capacity"),
+            )
+        if value == self.CLOSED:
+            return self.filter(
+                models.Q(filled__gte=models.F("capacity"))
+                | models.Q(end_date__lt=today),
+                start_date__lte=today,
+            )
+        if value == self.INACTIVE:
+            return self.filter(start_date__gt=today)
+        return self.none()
+
+    def open(self, today=None):
+        return self.filter_status(self.OPEN, today)
+
+    def try_fill(self, pk):
+        # Conditional UPDATEs: the row count reports whether the change applied,
+        # so concurrent accepts can never push filled past capacity.
+        updated = self.filter(pk=pk, filled__lt=models.F("capacity")).update(
+            filled=models.F("filled") + 1
+        )
+        return updated == 1
+
+    def release_seat(self, pk):
+        updated = self.filter(pk=pk, filled__gt=0).update(filled=models.F("filled") - 1)
+        return updated == 1
+
+    def bump_request_count(self, pk, delta=1):
+        updated = self.filter(pk=pk).update(
+            request_count=models.F("request_count") + delta
+        )
+        return updated == 1
+
+
+def new_position_notify_until():
+    return timezone.now() + timedelta(seconds=settings.NEW_POSITION_NOTIFY_WINDOW)
+
+
 class Position(models.Model):
     title = models.CharField(max_length=63)
     description = models.TextField()
@@ -158,13 +280,93 @@ class Position(models.Model):
     end_date = models.DateField()
     position_start_date = models.DateField()
     position_end_date = models.DateField()
+    # Stored columns generated from position_start_date, so term filters can use
+    # an index and queryset.update()/bulk_update() can't leave them stale.
+    season = models.GeneratedField(
+        expression=models.Case(
+            models.When(
+                position_start_date__month__lte=5, then=SeasonChoices.SPRING.value
+            ),
+            models.When(
+                position_start_date__month__lte=9, then=SeasonChoices.SUMMER.value
+            ),
+            default=SeasonChoices.WINTER.value,
+        ),
+        output_field=models.PositiveSmallIntegerField(choices=SeasonChoices),
+        db_persist=True,
+    )
+    start_year = models.GeneratedField(
+        expression=ExtractYear("position_start_date"),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
+
+    TERM_FIELDS = ("season", "start_year")
 
     fee = models.FloatField()
 
+    # Until then, the first tags added to a new position notify the students
+    # following them; claimed by the conditional UPDATE that clears it.
+    notify_until = models.DateTimeField(
+        null=True, default=new_position_notify_until, editable=False
+    )
+
+    # Columns that are not part of any API response.
+    HIDDEN_FIELDS = (*TERM_FIELDS, "notify_until")
+
     notification_item = GenericRelation(
         "NotificationItem", related_query_name="position"
     )
 
+    objects = PositionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="position_recent_idx"),
+            models.Index(
+                fields=["end_date", "start_date"],
+                condition=models.Q(filled__lt=models.F("capacity")),
+                name="position_open_idx",
+            ),
+            models.Index(
+                fields=["season", "start_year", "fee"],
+                name="position_season_year_fee_idx",
+            ),
+        ]
+
+    def compute_status(self, today=None):
+        today = today or timezone.now().date()
+        if self.start_date > today:
+            return PositionQuerySet.INACTIVE
+        if self.capacity <= self.filled or self.end_date < today:
+            return PositionQuerySet.CLOSED
+        return PositionQuerySet.OPEN
+
+
+class PositionSearchDocument(models.Model):
+    # Denormalized text of a position and its professor, kept in sync by
+    # eduportal.utils.search. `vector` is only populated on PostgreSQL; SQLite
+    # mirrors the text columns into an FTS5 table instead.
+    position = models.OneToOneField(
+        Position,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    title = models.TextField()
+    tags = models.TextField(blank=True)
+    people = models.TextField(blank=True)
+    description = models.TextField(blank=True)
+    vector = SearchVectorField(null=True)
+
+
+request_status_changed = Signal()
+
+
+class RequestQuerySet(models.QuerySet):
+    def with_parties(self):
+        return self.select_related("position__professor__user", "student__user")
+
 
 class Request(models.Model):
     REQUEST_STATUS = [
@@ -185,6 +387,43 @@ class Request(models.Model):
     cover_letter = models.TextField()
     share_with_others = models.BooleanField(default=False)
 
+    objects = RequestQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "position"], name="request_unique_student_position"
+            ),
+        ]
+
+    def transition(self, from_status, to_status):
+        # A single UPDATE keyed on the expected old status; of several
+        # concurrent transitions on the same request only one can match.
+        # Receivers write their outbox events in the same transaction.
+        with transaction.atomic():
+            updated = Request.objects.filter(pk=self.pk, status=from_status).update(
+                status=to_status
+            )
+            if not updated:
+                return False
+            self.status = to_status
+            request_status_changed.send(
+                sender=Request, instance=self, old_status=from_status
+            )
+        return True
+
+    def accept(self):
+        return self.transition("PP", "PA")
+
+    def reject(self):
+        return self.transition("PP", "PR")
+
+    def student_accept(self):
+        return self.transition("PA", "SA")
+
+    def student_reject(self):
+        return self.transition("PA", "SR")
+
 
 # CV models --------------------------------------------------------------------
 
@@ -268,6 +507,27 @@ class Notification(models.Model):
     bookmarked = models.BooleanField(default=False)
     notification_type = models.IntegerField(choices=NotificationTypeChoices)
     user = models.ForeignKey(UserModel, on_delete=models.CASCADE)
+    # Display snapshot built by serializers.notification_payload().
+    payload = models.JSONField(null=True, editable=False)
+    payload_version = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-id"], name="notification_user_recent_idx"),
+        ]
+
+
+class NotificationCounter(models.Model):
+    # Per-user notification counts, kept in step with Notification rows so the
+    # badge endpoints never count them; see utils/notifications.py.
+    user = models.OneToOneField(
+        UserModel,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="notification_counter",
+    )
+    total = models.IntegerField(default=0)
+    unread = models.IntegerField(default=0)
 
 
 class NotificationItem(models.Model):
@@ -281,3 +541,23 @@ class NotificationItem(models.Model):
         indexes = [
             models.Index(fields=["content_type", "object_id"]),
         ]
+
+
+class OutboxEvent(models.Model):
+    # Side effects recorded in the transaction that caused them and carried
+    # out after that commit, in the web process or by `manage.py run_outbox`;
+    # see utils/outbox.py.
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["available_at", "id"], name="outbox_available_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.topic} #{self.pk}"
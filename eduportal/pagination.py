@@ -1,16 +1,46 @@
 from collections import OrderedDict
-from rest_framework.pagination import PageNumberPagination
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.renderers import BaseRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
 
 
 class CustomPagination(PageNumberPagination):
+    cursor_query_param = "cursor"
+    default_cursor_ordering = "-id"
+
+    # Overrides the view's `cursor_ordering` for a single paginated action.
+    cursor_ordering = None
+
     def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            if queryset.query.is_sliced:
+                return None
+            self.cursor_paginator = CursorPagination()
+            self.cursor_paginator.cursor_query_param = self.cursor_query_param
+            self.cursor_paginator.ordering = self.get_cursor_ordering(view)
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
         if "page" in request.query_params:
             return super().paginate_queryset(queryset, request, view)
         else:
             return None
 
+    def get_cursor_ordering(self, view):
+        return (
+            self.cursor_ordering
+            or getattr(view, "cursor_ordering", None)
+            or self.default_cursor_ordering
+        )
+
     def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
         if self.page is not None:
             response = super().get_paginated_response(data)
             ordered_response_data = OrderedDict()
@@ -22,7 +52,8 @@ class CustomPagination(PageNumberPagination):
 
 
 class PaginatedActionMixin:
-    def paginated_action(self, queryset, serializer_class):
+    def paginated_action(self, queryset, serializer_class, cursor_ordering=None):
+        self.paginator.cursor_ordering = cursor_ordering
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = serializer_class(page, many=True)
@@ -30,3 +61,89 @@ class PaginatedActionMixin:
 
         serializer = serializer_class(queryset, many=True)
         return Response(serializer.data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+        rows = data if isinstance(data, list) else [data]
+        return "".join(encoder.encode(row) + "\n" for row in rows).encode()
+
+
+class StreamingResponseMixin:
+    # Clients that ask for it with `?stream=json`, `?stream=ndjson` or
+    # `Accept: application/x-ndjson` get the collection streamed row by row.
+    # Everyone else gets a regular DRF response, so renderers and ?format=
+    # keep working.
+    stream_query_param = "stream"
+    stream_chunk_size = 500
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    def stream_format(self):
+        requested = self.request.query_params.get(self.stream_query_param)
+        if requested in ("json", "ndjson"):
+            return requested
+        if isinstance(self.request.accepted_renderer, NDJSONRenderer):
+            return "ndjson"
+        return None
+
+    def streaming_response(self, queryset, serializer_class=None, context=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        stream_format = self.stream_format()
+        if stream_format is None:
+            return Response(serializer_class(queryset, many=True, context=context).data)
+
+        ndjson = stream_format == "ndjson"
+        chunks = stream_json(
+            queryset, serializer_class, context, self.stream_chunk_size, ndjson
+        )
+        content_type = NDJSONRenderer.media_type if ndjson else "application/json"
+        return streaming_http_response(self.request, chunks, content_type)
+
+
+class StreamingListMixin(StreamingResponseMixin):
+    def list(self, request, *args, **kwargs):
+        if self.stream_format() is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        return self.streaming_response(queryset, context=self.get_serializer_context())
+
+
+def stream_json(queryset, serializer_class, context, chunk_size, ndjson=False):
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    rows = queryset.iterator(chunk_size=chunk_size)
+
+    if ndjson:
+        for obj in rows:
+            yield encoder.encode(serializer_class(obj, context=context).data) + "\n"
+        return
+
+    separator = "["
+    for obj in rows:
+        yield separator + encoder.encode(serializer_class(obj, context=context).data)
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+def streaming_http_response(request, chunks, content_type):
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        chunks = iterate_in_thread(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+async def iterate_in_thread(iterator):
+    # Under ASGI a sync iterator would be buffered whole by Django, so each
+    # chunk is pulled on the thread that owns the database connection.
+    done = object()
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(iterator, done)) is not done:
+        yield chunk
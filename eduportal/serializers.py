@@ -6,7 +6,7 @@ from django_countries.serializer_fields import CountryField as CountrySerializer
 from eduportal.models import Position
 from ticketing_system.models import *
 from rest_framework import serializers
-from django.db.models import Avg
+from django.db.models import Avg, prefetch_related_objects
 
 from pprint import pprint
 
@@ -37,7 +37,7 @@ class SimpleProfessorSerializer(
 ):
     class Meta:
         model = Professor
-        fields = "__all__"
+        exclude = Professor.SCORE_FIELDS
 
 
 class SimpleStudentSerializer(
@@ -52,7 +52,7 @@ class SimpleStudentSerializer(
 
     class Meta:
         model = Student
-        fields = "__all__"
+        exclude = Student.SCORE_FIELDS
 
     def get_first_name(self, student: Student):
         return student.user.first_name
@@ -164,7 +164,7 @@ class LandingUniversitySerializer(serializers.ModelSerializer):
 class StudentGetListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
-        fields = "__all__"
+        exclude = Student.SCORE_FIELDS
 
     major = serializers.CharField(source="get_major_display")
     image = StudentImageSerializer(read_only=True)
@@ -174,7 +174,7 @@ class StudentGetListSerializer(serializers.ModelSerializer):
 class StudentRequestGetListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
-        fields = "__all__"
+        exclude = Student.SCORE_FIELDS
 
     user = SimpleUserSerializer()
 
@@ -321,14 +321,8 @@ class BasePositionSerializer(
     )
 
     def get_status(self, pos: Position) -> str:
-        (OPEN, CLOSED, INACTIVE) = ("Open", "Closed", "Not Active")
-        if pos.start_date > timezone.now().date():
-            return INACTIVE
-        if pos.capacity <= pos.filled:
-            return CLOSED
-        if pos.end_date < timezone.now().date():
-            return CLOSED
-        return OPEN
+        # Querysets built with Position.objects.with_status() carry the status.
+        return getattr(pos, "status", None) or pos.compute_status()
 
 
 class BasePositionListSerializer(
@@ -344,6 +338,7 @@ class BasePositionListSerializer(
             "capacity",
             "filled",
             "request_count",
+            *Position.HIDDEN_FIELDS,
         ]
 
     def get_university_name(self, pos: Position):
@@ -370,6 +365,7 @@ class BasePositionDetailSerializer(
             "capacity",
             "filled",
             "request_count",
+            *Position.HIDDEN_FIELDS,
         ]
 
     def get_university(self, pos: Position):
@@ -426,6 +422,7 @@ class OwnerPositionListSerializer(
         exclude = [
             "description",
             "professor",
+            *Position.HIDDEN_FIELDS,
         ]
 
 
@@ -470,6 +467,7 @@ class OwnerPositionDetailSerializer(
         model = Position
         exclude = [
             "professor",
+            *Position.HIDDEN_FIELDS,
         ]
 
     def get_requests(self, pos: Position):
@@ -486,6 +484,7 @@ class PositionUpdateSerializer(
             "professor",
             "request_count",
             "filled",
+            *Position.HIDDEN_FIELDS,
         ]
 
     def validate(self, data):
@@ -529,14 +528,7 @@ class ProfessorPositionFilterSerializer(serializers.ModelSerializer):
     university_id = serializers.SerializerMethodField()
 
     def get_status(self, pos: Position) -> str:
-        (OPEN, CLOSED, INACTIVE) = ("Open", "Closed", "Not Active")
-        if pos.start_date > timezone.now().date():
-            return INACTIVE
-        if pos.capacity <= pos.filled:
-            return CLOSED
-        if pos.end_date < timezone.now().date():
-            return CLOSED
-        return OPEN
+        return getattr(pos, "status", None) or pos.compute_status()
 
     def get_university_id(self,pos:Position):
         if pos.professor.university is not None:
@@ -563,10 +555,7 @@ class StudentCreateRequestSerializer(serializers.ModelSerializer):
     position_id = serializers.IntegerField()
 
     def create(self, validated_data):
-        validated_data["student"] = Student.objects.get(pk=self.context["student_id"])
-        validated_data["position"] = get_object_or_404(
-            Position, pk=validated_data["position_id"]
-        )
+        validated_data["student_id"] = self.context["student_id"]
         return super().create(validated_data)
 
 
@@ -597,6 +586,13 @@ class ProfessorRequestUpdateSeralizer(serializers.ModelSerializer):
         fields = ("status",)
 
 
+class ProfessorBulkResponseSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
+    status = serializers.ChoiceField(choices=["PA", "PR"])
+
+
 class StudentRequestUpdateSeralizer(serializers.ModelSerializer):
     class Meta:
         model = Request
@@ -730,51 +726,90 @@ class NotifPositionSerializer(serializers.ModelSerializer):
         ]
 
 
+NOTIFICATION_PAYLOAD_VERSION = 1
+
+
+def notification_payload(*objects):
+    # What a notification displays, stored on the row when it is created so
+    # listing notifications never has to resolve its generic relations.
+    position = student = None
+    for obj in objects:
+        if isinstance(obj, Request):
+            position, student = obj.position, obj.student
+        elif isinstance(obj, Position):
+            position = obj
+        elif isinstance(obj, Student):
+            student = obj
+    return {
+        "payload": {
+            "position": NotifPositionSerializer(position).data if position else None,
+            "student": NotifStudentSerializer(student).data if student else None,
+        },
+        "payload_version": NOTIFICATION_PAYLOAD_VERSION,
+    }
+
+
+# What rendering a payload from each kind of notification item reads.
+PAYLOAD_PREFETCHES = {
+    Request: [
+        "student__user",
+        "student__university",
+        "position__professor__user",
+        "position__professor__university",
+    ],
+    Position: ["professor__user", "professor__university"],
+    Student: ["user", "university"],
+}
+
+
+def prefetch_missing_payloads(notifications):
+    # Rows from before payloads existed are rendered from their items; load
+    # those items and what they point to in a few queries instead of per row.
+    missing = [obj for obj in notifications if obj.payload is None]
+    if not missing:
+        return
+    prefetch_related_objects(missing, "items__content_object")
+    objects_by_model = {}
+    for obj in missing:
+        for item in obj.items.all():
+            if item.content_object is not None:
+                model = type(item.content_object)
+                objects_by_model.setdefault(model, []).append(item.content_object)
+    for model, objects in objects_by_model.items():
+        prefetch_related_objects(objects, *PAYLOAD_PREFETCHES.get(model, []))
+
+
+class NotificationListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        notifications = list(data.all() if hasattr(data, "all") else data)
+        prefetch_missing_payloads(notifications)
+        return super().to_representation(notifications)
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     position = serializers.SerializerMethodField()
     student = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
-        exclude = []
+        exclude = ["payload", "payload_version"]
+        list_serializer_class = NotificationListSerializer
 
     def get_position(self, obj: Notification):
-        pos = None
-        request = self.get_model_item(obj, Request)
-
-        if request:
-            pos = request.position
-        else:
-            pos = self.get_model_item(obj, Position)
-
-        if pos:
-            return NotifPositionSerializer(pos).data
-        return None
+        return self.get_payload(obj)["position"]
 
     def get_student(self, obj: Notification):
-        stu = None
-
-        request = self.get_model_item(obj, Request)
-
-        if request:
-            stu = request.student
-        else:
-            stu = self.get_model_item(obj, Student)
+        return self.get_payload(obj)["student"]
 
-        if stu:
-            return NotifStudentSerializer(stu).data
-        return None
-
-    def get_model_item(self, obj: Notification, model):
-        item = None
-        item_list = getattr(
-            obj, f"{model._meta.app_label}_{model._meta.model_name}_items", []
-        )
-        if item_list:
-            item = item_list[0]
-        if item:
-            return item.content_object
-        return None
+    def get_payload(self, obj: Notification):
+        if obj.payload is None:
+            # Rows from before payloads existed, until
+            # rebuild_notification_payloads has been run.
+            items = obj.items.all()
+            obj.payload = notification_payload(
+                *[item.content_object for item in items]
+            )["payload"]
+        return obj.payload
 
 
 # Top 5 Student Seralizer ------------------------------------------------------
@@ -808,8 +843,7 @@ class TopStudentsSerializer(serializers.ModelSerializer):
         )
 
     def get_gpa(self, student: Student):
-        if hasattr(student, 'avg_grade'):
-            return student.avg_grade
+        return student.avg_grade
 
 
 
@@ -827,7 +861,7 @@ class TopProfessorsSerializer(serializers.ModelSerializer):
         )
 
     image = ProfessorImageSerializer(read_only=True)
-    project_num = serializers.IntegerField()
+    project_num = serializers.IntegerField(source="project_count")
     university = UniversityLocationSerializer()
     major = serializers.CharField(source="get_major_display")
     professor_name = serializers.SerializerMethodField()
@@ -849,6 +883,7 @@ class ProfessorPositionSearchSerializer(BasePositionSerializer):
         model = Position
         exclude = [
             "description",
+            *Position.HIDDEN_FIELDS,
         ]
 
     def get_university_name(self, pos: Position):
@@ -888,37 +923,31 @@ class ChatSystemSerializer(serializers.ModelSerializer):
 
     def get_group_name(self, chat: ChatSystem):
         user_pk = self.context["request"].user.id
-        person = chat.participants.exclude(pk=user_pk).first()
+        person = next(
+            person for person in chat.participants.all() if person.pk != user_pk
+        )
         return " ".join([person.first_name, person.last_name])
 
     def get_person_of_the_last_message(self, chat: ChatSystem):
-        last_message = chat.messages.order_by("-send_time").first()
-        if last_message is None:
+        if chat.last_message_id is None or chat.last_message_user is None:
             return None
-        return last_message.user.first_name + last_message.user.last_name
+        return chat.last_message_user.first_name + chat.last_message_user.last_name
 
     def get_time_of_the_last_message(self, chat: ChatSystem):
-        last_message = chat.messages.order_by("send_time").reverse().first()
-        if last_message is None:
+        if chat.last_message_id is None:
             return None
-        return last_message.send_time
+        return chat.last_message_time
 
     def get_part_of_last_message(self, chat: ChatSystem):
-        last_message = chat.messages.order_by("send_time").reverse().first()
-        if last_message is None:
+        if chat.last_message_id is None:
             return None
-        return last_message.text[:50]
+        return chat.last_message_preview
 
     def get_unseen_messages_flag(self, chat: ChatSystem):
-        if chat.messages is None:
-            return False
-        chat_messages = chat.messages.all()
+        if hasattr(chat, "unread_count"):
+            return bool(chat.unread_count)
         user = self.context["request"].user
-        other_person_chats = chat_messages.exclude(user=user)
-        unseen_messages = other_person_chats.filter(seen_flag=False)
-        if unseen_messages.exists():
-            return True
-        return False
+        return chat.unread_counters.filter(user=user, count__gt=0).exists()
 
 
 class NoChatProfessorsListSerializer(serializers.ModelSerializer):
@@ -1,14 +1,23 @@
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
 from django.db import transaction
-from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
 
 from eduportal.models import *
 from ticketing_system.models import *
-from ..serializers import NotificationSerializer, RetrieveMessageSerializer
+from ..serializers import RetrieveMessageSerializer
+from ..utils import (
+    chats,
+    landing,
+    leaderboard,
+    notifications,
+    outbox,
+    presence,
+    search,
+)
 
 
 @receiver(post_save, sender=get_user_model())
@@ -36,175 +45,139 @@ def create_professor_cv(sender, instance, created, **kwargs):
         CV.objects.create(professor=instance)
 
 
-@receiver(post_delete, sender=NotificationItem)
-@transaction.atomic
-def delete_notification(sender, instance, **kwargs):
-    instance.notification.delete()
-
-
 @receiver(post_save, sender=Request)
-@transaction.atomic
-def create_request_notification(sender, instance, created, **kwargs):
+def publish_request_created(sender, instance, created, **kwargs):
     if created:
-        content_type = ContentType.objects.get_for_model(instance)
-
-        notification_item, created = NotificationItem.objects.get_or_create(
-            content_type=content_type, object_id=instance.id
-        )
-
-        print(
-            f"create_request_notification:\tDebug:\t\t{'Created' if created else 'Retrieved'} NotificationItem object."
-        )
-
-        notif = Notification.objects.create(
-            notification_type=NotificationTypeChoices.STUDENT_CREATED_REQUEST,
-            user=instance.position.professor.user,
-        )
-
-        print("create_request_notification:\tDebug:\t\tCreated Notification object.")
-
-        notification_item.notifications.add(notif)
-
-        print("create_request_notification:\tDebug:\t\tCreated Notification object.")
-
-
-@receiver(pre_save, sender=Request)
-@transaction.atomic
-def create_professor_response_notification(sender, instance, **kwargs):
-    if instance.pk:
-        old_instance = sender.objects.get(pk=instance.pk)
-        if old_instance.status == "PP" and instance.status in ["PA", "PR"]:
-            content_type = ContentType.objects.get_for_model(instance)
-
-            notification_item, created = NotificationItem.objects.get_or_create(
-                content_type=content_type, object_id=instance.id
+        outbox.publish("request.created", request=instance.pk)
+
+
+@outbox.handler("request.created")
+def create_request_notification(request):
+    instance = (
+        Request.objects.with_parties()
+        .select_related("position__professor__university", "student__university")
+        .filter(pk=request)
+        .first()
+    )
+    if instance is None:
+        return
+    notifications.bulk_notify(
+        [
+            (
+                (instance,),
+                instance.position.professor.user,
+                NotificationTypeChoices.STUDENT_CREATED_REQUEST,
             )
+        ]
+    )
+
+
+REQUEST_STATUS_NOTIFICATIONS = {
+    "PA": NotificationTypeChoices.PROFESSOR_ACCEPTED_REQUEST,
+    "PR": NotificationTypeChoices.PROFESSOR_REJECTED_REQUEST,
+    "SA": NotificationTypeChoices.STUDENT_ACCEPTED_REQUEST,
+    "SR": NotificationTypeChoices.STUDENT_REJECTED_REQUEST,
+}
+
+
+# professor_respond() in utils/bulk_requests.py does what these receivers do
+# once per bulk answer instead of sending the signal for every request.
+@receiver(request_status_changed, sender=Request)
+def publish_request_status_changed(sender, instance, old_status, **kwargs):
+    if instance.status in REQUEST_STATUS_NOTIFICATIONS:
+        outbox.publish(
+            "request.status_changed",
+            requests=[instance.pk],
+            old_status=old_status,
+            status=instance.status,
+        )
 
-            notification_type = (
-                NotificationTypeChoices.PROFESSOR_ACCEPTED_REQUEST
-                if instance.status == "PA"
-                else NotificationTypeChoices.PROFESSOR_REJECTED_REQUEST
-            )
 
-            notif = Notification.objects.create(
-                notification_type=notification_type,
-                user=instance.student.user,
+@outbox.handler("request.status_changed")
+def create_request_status_notification(requests, old_status, status):
+    instances = (
+        Request.objects.with_parties()
+        .select_related("position__professor__university", "student__university")
+        .filter(pk__in=requests)
+    )
+    notifications.bulk_notify(
+        [
+            (
+                (instance,),
+                (
+                    instance.student.user
+                    if old_status == "PP"
+                    else instance.position.professor.user
+                ),
+                REQUEST_STATUS_NOTIFICATIONS[status],
             )
+            for instance in instances
+        ]
+    )
 
-            notification_item.notifications.add(notif)
-
-
-@receiver(pre_save, sender=Request)
-@transaction.atomic
-def create_student_response_notification(sender, instance, **kwargs):
-    if instance.pk:
-        old_instance = sender.objects.get(pk=instance.pk)
-        if old_instance.status == "PA" and instance.status in ["SA", "SR"]:
-            content_type = ContentType.objects.get_for_model(instance)
-
-            notification_item, created = NotificationItem.objects.get_or_create(
-                content_type=content_type, object_id=instance.id
-            )
 
-            notification_type = (
-                NotificationTypeChoices.STUDENT_ACCEPTED_REQUEST
-                if instance.status == "SA"
-                else NotificationTypeChoices.STUDENT_REJECTED_REQUEST
-            )
+@receiver(post_save, sender=Request)
+@receiver(post_delete, sender=Request)
+@receiver(request_status_changed, sender=Request)
+def update_request_leaderboards(sender, instance, **kwargs):
+    leaderboard.refresh_students(Student.objects.filter(pk=instance.student_id))
+    leaderboard.refresh_professors(
+        Professor.objects.filter(positions=instance.position_id)
+    )
 
-            notif = Notification.objects.create(
-                notification_type=notification_type,
-                user=instance.position.professor.user,
-            )
 
-            notification_item.notifications.add(notif)
+@receiver(post_save, sender=EducationHistory)
+@receiver(post_delete, sender=EducationHistory)
+def update_student_grade(sender, instance, **kwargs):
+    leaderboard.refresh_students(Student.objects.filter(cv=instance.cv_id))
 
 
-@receiver(post_save, sender=Position)
-@transaction.atomic
-def mark_position_as_created(sender, instance, created, **kwargs):
-    if created:
-        created_positions = cache.get("created_positions", set())
-        created_positions.add(instance.id)
-        cache.set("created_positions", created_positions)
+@receiver(post_save, sender=ProjectExperience)
+@receiver(post_delete, sender=ProjectExperience)
+def update_professor_project_count(sender, instance, **kwargs):
+    leaderboard.refresh_professors(Professor.objects.filter(cv=instance.cv_id))
 
 
 @receiver(m2m_changed, sender=Position.tags2.through)
-@transaction.atomic
-def create_interested_students_notification(sender, instance, action, **kwargs):
-    if action == "post_add":
-        created_positions = cache.get("created_positions", set())
-        if instance.id in created_positions:
-            content_type = ContentType.objects.get_for_model(instance)
-
-            position_ni, created = NotificationItem.objects.get_or_create(
-                content_type=content_type, object_id=instance.id
-            )
-
-            tags = instance.tags2
-            notified = set()
-
-            for t in tags.all():
-                students = t.students
-
-                for s in students.all():
-                    if s.id not in notified:
-                        std_ct = ContentType.objects.get_for_model(s)
-                        std_ni, std_ni_created = NotificationItem.objects.get_or_create(
-                            content_type=std_ct, object_id=s.id
-                        )
-
-                        notif = Notification.objects.create(
-                            notification_type=NotificationTypeChoices.NEW_TAGGED_POST,
-                            user=s.user,
-                        )
-
-                        position_ni.notifications.add(notif)
-                        std_ni.notifications.add(notif)
-                        notified.add(s.id)
-
-            # Remove the instance from the set in the cache
-            created_positions.remove(instance.id)
-            cache.set("created_positions", created_positions)
+def create_interested_students_notification(
+    sender, instance, action, reverse, **kwargs
+):
+    if action != "post_add" or reverse:
+        return
+    # Clearing notify_until claims the position's notification, so only one
+    # worker fans out, however many times tags are added.
+    claimed = Position.objects.filter(
+        pk=instance.pk, notify_until__gte=timezone.now()
+    ).update(notify_until=None)
+    if claimed:
+        outbox.publish("position.tagged", position=instance.pk)
+
+
+@outbox.handler("position.tagged")
+def notify_interested_students(position):
+    instance = (
+        Position.objects.select_related("professor__user", "professor__university")
+        .filter(pk=position)
+        .first()
+    )
+    if instance is not None:
+        notifications.notify_interested_students(instance)
 
 
 @receiver(post_save, sender=Notification)
 def notification_created(sender, instance, created, **kwargs):
     if created:
+        notifications.adjust_counters(
+            {instance.user_id: (1, 0 if instance.read else 1)}
+        )
+        notifications.queue_push([instance])
 
-        print("notification_created:\t\tDebug:\t\tBefore defining the action.")
-
-        def send_notification():
-            print("notification_created:\t\tDebug:\t\tStarting the action.")
-
-            channel_layer = get_channel_layer()
-            print(
-                f"notification_created:\t\tDebug:\t\tRetrieved channel: {channel_layer}"
-            )
-            group_name = f"notification_{instance.user.id}"
-            print(f"notification_created:\t\tDebug:\t\tRetrieved group: {group_name}")
-            serializer = NotificationSerializer(instance)
-            print(
-                f"notification_created:\t\tDebug:\t\tRetrieved serializer: {serializer}"
-            )
-            message = serializer.data
-            print(f"notification_created:\t\tDebug:\t\tRetrieved message: {message}")
-
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    "type": "send_notification",
-                    "message": message,
-                },
-            )
-
-            print("notification_created:\t\tDebug:\t\tGroup send initiated.")
-
-        print("notification_created:\t\tDebug:\t\tDefined the action.")
-
-        transaction.on_commit(send_notification)
 
-        print("notification_created:\t\tDebug:\t\tRegistered the transaction.")
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    # Covers cascades too, e.g. a deleted user; that user's counter is
+    # deleted with them and the update finds nothing.
+    notifications.adjust_counters({instance.user_id: (-1, 0 if instance.read else -1)})
 
 
 @receiver(post_save, sender=Message)
@@ -213,11 +186,13 @@ def message_created(sender, instance, created, **kwargs):
         print("message_created:\t\tDebug:\t\tBefore defining the action.")
 
         def send_message():
+            group_name = f"chat_{instance.related_chat_group_id}"
+            if not presence.is_online(group_name):
+                return
             print("message_created:\t\tDebug:\t\tStarting the action.")
 
             channel_layer = get_channel_layer()
             print(f"message_created:\t\tDebug:\t\tRetrieved channel: {channel_layer}")
-            group_name = f"chat_{instance.related_chat_group.id}"
             print(f"message_created:\t\tDebug:\t\tRetrieved group: {group_name}")
             serializer = RetrieveMessageSerializer(instance)
             print(f"message_created:\t\tDebug:\t\tRetrieved serializer: {serializer}")
@@ -239,3 +214,76 @@ def message_created(sender, instance, created, **kwargs):
         transaction.on_commit(send_message)
 
         print("message_created:\t\tDebug:\t\tRegistered the transaction.")
+
+
+@receiver(post_save, sender=Message)
+def update_chat_summary(sender, instance, created, **kwargs):
+    if created:
+        chats.record_message(instance)
+    else:
+        chats.update_message(instance)
+
+
+@receiver(post_delete, sender=Message)
+def remove_from_chat_summary(sender, instance, **kwargs):
+    chats.forget_message(instance)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Professor)
+@receiver(post_delete, sender=Professor)
+@receiver(post_save, sender=University)
+@receiver(post_delete, sender=University)
+@receiver(post_save, sender=Position)
+@receiver(post_delete, sender=Position)
+@receiver(post_save, sender=Request)
+@receiver(post_delete, sender=Request)
+@receiver(request_status_changed, sender=Request)
+def invalidate_landing_snapshot(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(landing.mark_stale)
+
+
+@receiver(post_save, sender=Position)
+def index_position(sender, instance, **kwargs):
+    search.index_positions(Position.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Position)
+def unindex_position(sender, instance, **kwargs):
+    search.unindex_position(instance.pk)
+
+
+@receiver(m2m_changed, sender=Position.tags.through)
+def reindex_position_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+    if not reverse:
+        search.index_positions(Position.objects.filter(pk=instance.pk))
+    elif pk_set:
+        search.index_positions(Position.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Professor)
+def reindex_professor_positions(sender, instance, created, **kwargs):
+    if not created:
+        search.index_positions(Position.objects.filter(professor=instance))
+
+
+@receiver(post_save, sender=get_user_model())
+def reindex_user_positions(sender, instance, created, update_fields=None, **kwargs):
+    if created or instance.is_student:
+        return
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    search.index_positions(Position.objects.filter(professor__user=instance))
+
+
+@receiver(post_save, sender=University)
+def reindex_university_positions(sender, instance, created, **kwargs):
+    if not created:
+        search.index_positions(Position.objects.filter(professor__university=instance))
@@ -1,3 +1,1381 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import io
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from xml.etree import ElementTree
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.db import (
+    IntegrityError,
+    OperationalError,
+    close_old_connections,
+    connection,
+    transaction,
+)
+from django.db.migrations.executor import MigrationExecutor
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+from rest_framework.test import APIClient
+
+from SevenApply.channels_postgres import PostgresChannelLayer
+from ticketing_system.models import ChatSystem, ChatUnreadCounter, Message
+from .consumers import NotificationConsumer, PresenceMixin
+from .models import (
+    Notification,
+    NotificationCounter,
+    OutboxEvent,
+    Position,
+    PositionSearchDocument,
+    Professor,
+    Request,
+    Student,
+    Tag2,
+    University,
+)
+from .utils import landing, notifications, outbox, presence, search
+from .utils.field_choices import SeasonChoices
 
 # Create your tests here.
+
+
+User = get_user_model()
+
+
+def create_university():
+    return University.objects.create(
+        name="U",
+        description="d",
+        latitude=0,
+        longitude=0,
+        image="u.png",
+        icon="u.png",
+        website_url="http://u",
+        rank=1,
+        city="c",
+        country="IR",
+        total_student_count=1,
+        international_student_count=1,
+    )
+
+
+def create_professor(email="professor@example.com", university=None):
+    user = User.objects.create_user(
+        email, "pw", first_name="Pro", last_name="Fessor", is_student=False
+    )
+    return Professor.objects.create(
+        user=user, university=university or create_university(), major=1
+    )
+
+
+def create_student(email="student@example.com"):
+    user = User.objects.create_user(
+        email, "pw", first_name="Stu", last_name="Dent", is_student=True
+    )
+    return Student.objects.create(user=user, major=1)
+
+
+def create_position(professor, capacity=3, **fields):
+    today = datetime.date.today()
+    return Position.objects.create(
+        **{
+            "title": "Position",
+            "description": "d",
+            "professor": professor,
+            "capacity": capacity,
+            "start_date": today - datetime.timedelta(days=1),
+            "end_date": today + datetime.timedelta(days=30),
+            "position_start_date": today,
+            "position_end_date": today + datetime.timedelta(days=90),
+            "fee": 0,
+            **fields,
+        }
+    )
+
+
+def response_json(response):
+    if response.streaming:
+        return json.loads(b"".join(response.streaming_content))
+    return response.json()
+
+
+def run_in_parallel(target, count):
+    # Starts `count` threads at the same instant and waits for all of them.
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        try:
+            barrier.wait()
+            results[index] = target(index)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def retry_on_lock(func, attempts=50):
+    # SQLite serializes writers by failing fast with "database table is
+    # locked"; retrying keeps the test about counter semantics on any backend.
+    for _ in range(attempts - 1):
+        try:
+            return func()
+        except OperationalError:
+            pass
+    return func()
+
+
+class PositionCounterConcurrencyTests(TransactionTestCase):
+    capacity = 3
+    workers = 10
+
+    def setUp(self):
+        self.professor = create_professor()
+        self.position = create_position(self.professor, capacity=self.capacity)
+
+    def test_parallel_fills_never_exceed_capacity(self):
+        results = run_in_parallel(
+            lambda _: retry_on_lock(
+                lambda: Position.objects.try_fill(self.position.pk)
+            ),
+            self.workers,
+        )
+
+        self.position.refresh_from_db()
+        self.assertEqual(self.position.filled, self.capacity)
+        self.assertEqual(results.count(True), self.capacity)
+
+    def test_parallel_request_count_bumps_are_not_lost(self):
+        run_in_parallel(
+            lambda _: retry_on_lock(
+                lambda: Position.objects.bump_request_count(self.position.pk)
+            ),
+            self.workers,
+        )
+
+        self.position.refresh_from_db()
+        self.assertEqual(self.position.request_count, self.workers)
+
+    # SQLite has no row locks; whole-request races need a backend that does.
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_parallel_accepts_never_exceed_capacity(self):
+        requests = []
+        for i in range(self.workers):
+            student = create_student(f"student{i}@example.com")
+            requests.append(
+                Request.objects.create(
+                    student=student, position=self.position, cover_letter="c"
+                )
+            )
+
+        def accept(index):
+            client = APIClient()
+            client.force_authenticate(self.professor.user)
+            url = f"/eduportal/requests/{requests[index].pk}/professor_accept_request/"
+            return client.get(url).status_code
+
+        statuses = run_in_parallel(accept, self.workers)
+
+        self.position.refresh_from_db()
+        self.assertEqual(self.position.filled, self.capacity)
+        self.assertEqual(statuses.count(200), self.capacity)
+        self.assertEqual(
+            Request.objects.filter(position=self.position, status="PA").count(),
+            self.capacity,
+        )
+
+    @skipUnlessDBFeature("has_select_for_update")
+    def test_bulk_and_single_accepts_do_not_deadlock(self):
+        requests = [
+            Request.objects.create(
+                student=create_student(f"student{i}@example.com"),
+                position=self.position,
+                cover_letter="c",
+            )
+            for i in range(self.workers)
+        ]
+        ids = [request.pk for request in requests]
+
+        def accept(index):
+            client = APIClient()
+            client.force_authenticate(self.professor.user)
+            if index % 2:
+                url = f"/eduportal/requests/{ids[index]}/professor_accept_request/"
+                return client.get(url).status_code
+            return client.post(
+                "/eduportal/requests/professor_bulk_respond/",
+                {"ids": ids[::-1], "status": "PA"},
+                format="json",
+            ).status_code
+
+        statuses = run_in_parallel(accept, self.workers)
+
+        self.assertTrue(set(statuses) <= {200, 405}, statuses)
+        self.position.refresh_from_db()
+        self.assertEqual(self.position.filled, self.capacity)
+        self.assertEqual(
+            Request.objects.filter(position=self.position, status="PA").count(),
+            self.capacity,
+        )
+
+
+# A database the channel layer tests may create tables in, for example
+# postgres://postgres@localhost/channels_test
+CHANNELS_POSTGRES_TEST_URL = os.environ.get("CHANNELS_POSTGRES_TEST_URL")
+
+
+def receive_in_process(dsn, group_expiry, ready, results, timeout=3):
+    # Joins the test group from a separate process and reports every message
+    # that arrives before `timeout` seconds of silence.
+    async def main():
+        layer = PostgresChannelLayer(dsn=dsn, group_expiry=group_expiry)
+        channel = await layer.new_channel()
+        await layer.group_add("tests", channel)
+        ready.set()
+
+        received = []
+        try:
+            while True:
+                received.append(await asyncio.wait_for(layer.receive(channel), timeout))
+        except asyncio.TimeoutError:
+            pass
+        await layer.close()
+        results.put(received)
+
+    asyncio.run(main())
+
+
+@skipUnless(CHANNELS_POSTGRES_TEST_URL, "CHANNELS_POSTGRES_TEST_URL is not set")
+class PostgresChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        self.context = multiprocessing.get_context("fork")
+        self.layer = PostgresChannelLayer(dsn=CHANNELS_POSTGRES_TEST_URL)
+        async_to_sync(self.layer.flush)()
+
+    def tearDown(self):
+        async_to_sync(self.layer.close)()
+
+    def start_receivers(self, count, group_expiry=60):
+        results = self.context.Queue()
+        processes = []
+        for _ in range(count):
+            ready = self.context.Event()
+            process = self.context.Process(
+                target=receive_in_process,
+                args=(CHANNELS_POSTGRES_TEST_URL, group_expiry, ready, results),
+            )
+            process.start()
+            self.assertTrue(ready.wait(10))
+            processes.append(process)
+        return processes, results
+
+    def collect(self, processes, results):
+        received = [results.get(timeout=20) for _ in processes]
+        for process in processes:
+            process.join()
+        return received
+
+    def test_group_send_reaches_every_process(self):
+        processes, results = self.start_receivers(2)
+
+        small = {"type": "send_notification", "message": {"id": 1}}
+        large = {"type": "send_notification", "message": {"text": "x" * 20000}}
+        async_to_sync(self.layer.group_send)("tests", small)
+        async_to_sync(self.layer.group_send)("tests", large)
+
+        for received in self.collect(processes, results):
+            self.assertEqual(received, [small, large])
+
+    def test_expired_membership_receives_nothing(self):
+        processes, results = self.start_receivers(1, group_expiry=1)
+        time.sleep(2)
+
+        async_to_sync(self.layer.group_send)("tests", {"type": "send_notification"})
+
+        self.assertEqual(self.collect(processes, results), [[]])
+
+    def test_receive_in_same_process(self):
+        async def main():
+            channel = await self.layer.new_channel()
+            await self.layer.send(channel, {"type": "test", "n": 1})
+            return await asyncio.wait_for(self.layer.receive(channel), 5)
+
+        self.assertEqual(async_to_sync(main)(), {"type": "test", "n": 1})
+
+    def test_listener_reconnects_after_connection_loss(self):
+        async def main():
+            channel = await self.layer.new_channel()
+            listener = self.layer.listen_connection
+            await self.layer.run(
+                "SELECT pg_terminate_backend(%s)", [listener.info.backend_pid]
+            )
+            # Delivery is at most once, so keep sending until the new
+            # listener is in place.
+            for n in range(50):
+                await self.layer.send(channel, {"type": "test", "n": n})
+                try:
+                    return await asyncio.wait_for(self.layer.receive(channel), 0.2)
+                except asyncio.TimeoutError:
+                    pass
+
+        message = async_to_sync(main)()
+        self.assertEqual(message["type"], "test")
+        self.assertIsNot(self.layer.listen_connection, None)
+        self.assertFalse(self.layer.listen_connection.closed)
+
+
+@override_settings(
+    LANDING_SNAPSHOT_REFRESH_INTERVAL=60,
+    LANDING_SNAPSHOT_MAX_AGE=300,
+    LANDING_SNAPSHOT_COLD_WAIT=0.3,
+)
+class LandingSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(
+            landing, "build_snapshot", wraps=landing.build_snapshot
+        )
+        self.build_snapshot = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(landing, "schedule_rebuild")
+        self.schedule_rebuild = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cache_snapshot(self, age):
+        snapshot = landing.minimal_snapshot()
+        snapshot["built_at"] -= age
+        cache.set(landing.SNAPSHOT_KEY, snapshot)
+        return snapshot
+
+    def test_cold_cache_builds_once_and_caches(self):
+        first = landing.get_snapshot()
+        second = landing.get_snapshot()
+
+        self.assertEqual(self.build_snapshot.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertIsNone(cache.get(landing.BUILD_LOCK_KEY))
+
+    def test_fresh_snapshot_is_served_from_cache(self):
+        snapshot = self.cache_snapshot(age=10)
+
+        self.assertEqual(landing.get_snapshot(), snapshot)
+        self.build_snapshot.assert_not_called()
+        self.schedule_rebuild.assert_not_called()
+
+    def test_stale_snapshot_is_served_while_refreshing(self):
+        snapshot = self.cache_snapshot(age=120)
+
+        self.assertEqual(landing.get_snapshot(), snapshot)
+        self.build_snapshot.assert_not_called()
+        self.schedule_rebuild.assert_called_once()
+
+    def test_expired_snapshot_is_rebuilt(self):
+        self.cache_snapshot(age=600)
+
+        snapshot = landing.get_snapshot()
+
+        self.build_snapshot.assert_called_once()
+        self.assertLess(landing.snapshot_age(snapshot), 60)
+
+    def test_cold_cache_waits_for_the_build_in_progress(self):
+        cache.add(landing.BUILD_LOCK_KEY, True)
+        built = threading.Timer(0.1, self.cache_snapshot, kwargs={"age": 0})
+        built.start()
+
+        snapshot = landing.get_snapshot()
+
+        built.join()
+        self.assertEqual(snapshot, cache.get(landing.SNAPSHOT_KEY))
+        self.build_snapshot.assert_not_called()
+
+    def test_cold_cache_falls_back_to_a_minimal_snapshot(self):
+        cache.add(landing.BUILD_LOCK_KEY, True)
+
+        snapshot = landing.get_snapshot()
+
+        self.build_snapshot.assert_not_called()
+        self.assertEqual(snapshot["position_pool"], [])
+        self.assertEqual(snapshot["professor_count"], 0)
+
+
+class ScoreFieldsTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor()
+
+    def test_plain_save_keeps_scores_written_meanwhile(self):
+        stale = Professor.objects.get(pk=self.professor.pk)
+        Professor.objects.filter(pk=self.professor.pk).update(project_count=5)
+
+        stale.department = "Physics"
+        stale.save()
+
+        self.professor.refresh_from_db()
+        self.assertEqual(self.professor.project_count, 5)
+        self.assertEqual(self.professor.department, "Physics")
+
+    def test_update_fields_can_write_scores(self):
+        self.professor.project_count = 7
+        self.professor.save(update_fields=["project_count"])
+
+        self.professor.refresh_from_db()
+        self.assertEqual(self.professor.project_count, 7)
+
+    def test_save_inserts_a_deleted_row_with_its_scores(self):
+        professor = Professor.objects.get(pk=self.professor.pk)
+        professor.project_count = 2
+        Professor.objects.filter(pk=professor.pk).delete()
+
+        professor.save()
+
+        self.assertEqual(Professor.objects.get(pk=professor.pk).project_count, 2)
+
+
+class PositionSearchTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor()
+        self.other = create_professor("other@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor.user)
+
+    def search(self, endpoint, query):
+        response = self.client.get(f"/eduportal/{endpoint}/", {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return {position["id"] for position in response_json(response)}
+
+    def test_matches_are_limited_after_the_queryset_filter(self):
+        for _ in range(5):
+            create_position(self.other, title="Robotics robotics robotics")
+        own = create_position(self.professor, title="Robotics")
+
+        results = search.search_positions(
+            Position.objects.filter(professor=self.professor), "robot"
+        )
+
+        self.assertEqual(list(results), [own])
+
+    def test_own_position_filter_matches_titles_only(self):
+        by_title = create_position(self.professor, title="Robotics lab")
+        by_description = create_position(
+            self.professor, title="Lab", description="robotics"
+        )
+
+        self.assertEqual(
+            self.search("prof_own_position_filter", "robotics"), {by_title.pk}
+        )
+        self.assertEqual(
+            self.search("prof_own_position_search", "robotics"),
+            {by_title.pk, by_description.pk},
+        )
+
+    def test_migration_indexes_existing_positions(self):
+        position = create_position(self.professor, title="Robotics")
+        PositionSearchDocument.objects.all().delete()
+        if search.has_fts_table():
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {search.FTS_TABLE}")
+        migration = importlib.import_module(
+            "eduportal.migrations.0035_positionsearchdocument"
+        )
+
+        state = MigrationExecutor(connection).loader.project_state(
+            ("eduportal", "0035_positionsearchdocument")
+        )
+
+        migration.index_positions(state.apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(
+            list(search.search_positions(Position.objects.all(), "robot")), [position]
+        )
+
+
+class StreamingListTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor()
+        self.positions = [create_position(self.professor) for _ in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor.user)
+        self.url = "/eduportal/prof_own_position_filter/"
+
+    def test_lists_use_drf_rendering_by_default(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.json()), 2)
+
+        response = self.client.get(self.url, {"format": "api"})
+        self.assertFalse(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+
+    def test_stream_query_param_streams_a_json_array(self):
+        response = self.client.get(self.url, {"stream": "json"})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            [position["id"] for position in response_json(response)],
+            [position.pk for position in self.positions],
+        )
+
+    def test_ndjson_accept_header_streams_one_object_per_line(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="application/x-ndjson")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+
+
+class PositionTermTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor()
+
+    def test_terms_follow_the_start_date(self):
+        position = create_position(
+            self.professor, position_start_date=datetime.date(2024, 3, 1)
+        )
+
+        position.refresh_from_db()
+        self.assertEqual(position.season, SeasonChoices.SPRING)
+        self.assertEqual(position.start_year, 2024)
+
+    def test_queryset_update_keeps_terms_in_sync(self):
+        position = create_position(
+            self.professor, position_start_date=datetime.date(2024, 3, 1)
+        )
+
+        Position.objects.filter(pk=position.pk).update(
+            position_start_date=datetime.date(2025, 11, 1)
+        )
+
+        position.refresh_from_db()
+        self.assertEqual(position.season, SeasonChoices.WINTER)
+        self.assertEqual(position.start_year, 2025)
+
+    def test_terms_are_not_part_of_position_responses(self):
+        position = create_position(self.professor)
+        client = APIClient()
+        client.force_authenticate(create_student().user)
+
+        listed = response_json(client.get("/eduportal/positions/"))
+        detail = client.get(f"/eduportal/positions/{position.pk}/").json()
+
+        for data in (listed[0], detail):
+            self.assertNotIn("season", data)
+            self.assertNotIn("start_year", data)
+
+
+@override_settings(OUTBOX_EAGER=False)
+class NewPositionTagsTests(TestCase):
+    def setUp(self):
+        self.position = create_position(create_professor())
+        self.tags = [Tag2.objects.create(label=label) for label in (1, 2)]
+
+    def published(self):
+        return list(
+            OutboxEvent.objects.filter(topic="position.tagged").values_list(
+                "payload", flat=True
+            )
+        )
+
+    def test_first_tags_notify_once(self):
+        self.position.tags2.add(self.tags[0])
+        self.position.tags2.add(self.tags[1])
+
+        self.assertEqual(self.published(), [{"position": self.position.pk}])
+
+    def test_tags_added_later_through_another_instance_notify(self):
+        Position.objects.get(pk=self.position.pk).tags2.add(*self.tags)
+
+        self.assertEqual(self.published(), [{"position": self.position.pk}])
+        self.position.refresh_from_db()
+        self.assertIsNone(self.position.notify_until)
+
+    def test_tags_added_after_the_window_do_not_notify(self):
+        Position.objects.filter(pk=self.position.pk).update(
+            notify_until=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        self.position.tags2.add(*self.tags)
+
+        self.assertEqual(self.published(), [])
+
+    def test_tag_side_additions_do_not_notify(self):
+        self.tags[0].position_set.add(self.position)
+
+        self.assertEqual(self.published(), [])
+
+
+class ProfessorBulkRespondTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor()
+        self.position = create_position(self.professor, capacity=2)
+        self.requests = [
+            Request.objects.create(
+                student=create_student(f"student{i}@example.com"),
+                position=self.position,
+                cover_letter="c",
+            )
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor.user)
+
+    def respond(self, ids, new_status):
+        response = self.client.post(
+            "/eduportal/requests/professor_bulk_respond/",
+            {"ids": ids, "status": new_status},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return {row["id"]: row["result"] for row in response.json()}
+
+    def test_accepting_stops_when_seats_run_out(self):
+        ids = [request.pk for request in self.requests]
+
+        results = self.respond(ids, "PA")
+
+        self.assertEqual(
+            results,
+            {ids[0]: "accepted", ids[1]: "accepted", ids[2]: "position_filled"},
+        )
+        self.position.refresh_from_db()
+        self.assertEqual(self.position.filled, 2)
+        self.assertEqual(
+            [student.accepted_request_count for student in self.students()], [1, 1, 0]
+        )
+
+    @override_settings(OUTBOX_EAGER=False)
+    def test_one_outbox_event_per_answer(self):
+        ids = [request.pk for request in self.requests]
+
+        self.respond(ids[:2], "PR")
+
+        event = OutboxEvent.objects.get(topic="request.status_changed")
+        self.assertEqual(
+            event.payload, {"requests": ids[:2], "old_status": "PP", "status": "PR"}
+        )
+
+    def students(self):
+        return [Student.objects.get(pk=request.student_id) for request in self.requests]
+
+    def test_requests_not_pending_are_skipped(self):
+        first, second, _ = self.requests
+        Request.objects.filter(pk=first.pk).update(status="PR")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            results = self.respond([first.pk, second.pk], "PR")
+
+        self.assertEqual(results, {first.pk: "invalid_status", second.pk: "rejected"})
+        self.assertEqual(
+            list(Notification.objects.values_list("user_id", flat=True)),
+            [second.student.user_id],
+        )
+
+    def test_other_professors_requests_are_not_found(self):
+        other_position = create_position(create_professor("other@example.com"))
+        other_request = Request.objects.create(
+            student=self.requests[0].student, position=other_position, cover_letter="c"
+        )
+
+        results = self.respond([other_request.pk, self.requests[0].pk], "PR")
+
+        self.assertEqual(
+            results, {other_request.pk: "not_found", self.requests[0].pk: "rejected"}
+        )
+        other_request.refresh_from_db()
+        self.assertEqual(other_request.status, "PP")
+
+
+class CreateRequestTests(TestCase):
+    def setUp(self):
+        self.position = create_position(create_professor())
+        self.student = create_student()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student.user)
+
+    def create_request(self):
+        return self.client.post(
+            "/eduportal/requests/",
+            {"position_id": self.position.pk, "cover_letter": "c"},
+            format="json",
+        )
+
+    def test_duplicate_request_is_rejected(self):
+        self.assertEqual(self.create_request().status_code, 200)
+
+        response = self.create_request()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Request.objects.count(), 1)
+        self.position.refresh_from_db()
+        self.assertEqual(self.position.request_count, 1)
+
+    def test_integrity_errors_from_receivers_are_not_duplicates(self):
+        def fail(sender, **kwargs):
+            raise IntegrityError("receiver failed")
+
+        post_save.connect(fail, sender=Request)
+        self.addCleanup(post_save.disconnect, fail, sender=Request)
+
+        with self.assertRaisesMessage(IntegrityError, "receiver failed"):
+            self.create_request()
+        self.assertFalse(Request.objects.exists())
+
+
+class RequestDeduplicationMigrationTests(TransactionTestCase):
+    def setUp(self):
+        self.state = MigrationExecutor(connection).loader.project_state(
+            ("eduportal", "0038_position_season_start_year")
+        )
+        self.constraint = next(
+            constraint
+            for constraint in Request._meta.constraints
+            if constraint.name == "request_unique_student_position"
+        )
+        # SQLite rebuilds the table from the model it is given, so drop the
+        # constraint through the model as it was before the migration.
+        with connection.schema_editor() as editor:
+            editor.remove_constraint(
+                self.state.apps.get_model("eduportal", "Request"), self.constraint
+            )
+        self.addCleanup(self.restore_constraint)
+
+    def restore_constraint(self):
+        Request.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.add_constraint(Request, self.constraint)
+
+    def test_keeps_most_advanced_request_and_recounts_position(self):
+        position = create_position(create_professor(), capacity=5)
+        student = create_student()
+        other = create_student("other@example.com")
+        rejected, accepted, pending = Request.objects.bulk_create(
+            [
+                Request(student=student, position=position, status=status)
+                for status in ("PR", "SA", "PP")
+            ]
+        )
+        first, second = Request.objects.bulk_create(
+            [Request(student=other, position=position) for _ in range(2)]
+        )
+        Position.objects.filter(pk=position.pk).update(filled=1, request_count=5)
+
+        migration = importlib.import_module(
+            "eduportal.migrations.0039_request_unique_student_position"
+        )
+        migration.remove_duplicate_requests(self.state.apps, None)
+
+        self.assertQuerySetEqual(
+            Request.objects.order_by("pk"), [accepted, first], ordered=True
+        )
+        position.refresh_from_db()
+        self.assertEqual((position.filled, position.request_count), (1, 2))
+
+
+class ApplicantExportTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor()
+        self.position = create_position(self.professor)
+        self.student = create_student()
+        self.student.user.first_name = '=HYPERLINK("http://evil")'
+        self.student.user.save()
+        self.student.cv.about = "Ünïcode & <tags>\x01"
+        self.student.cv.save()
+        Request.objects.create(
+            student=self.student, position=self.position, cover_letter="c"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor.user)
+
+    def export(self, file_format):
+        response = self.client.get(
+            "/eduportal/prof_req_filter/export/", {"file_format": file_format}
+        )
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv_has_a_header_and_escapes_formulas(self):
+        content = self.export("csv").decode("utf-8-sig")
+
+        header, row = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(header[:2], ["Request ID", "Position ID"])
+        values = dict(zip(header, row))
+        self.assertEqual(values["First Name"], '\'=HYPERLINK("http://evil")')
+        self.assertEqual(values["Status"], "Pending Professor Response")
+
+    def test_xlsx_keeps_text_as_written(self):
+        self.student.user.first_name = "-5"
+        self.student.user.save()
+
+        archive = zipfile.ZipFile(io.BytesIO(self.export("xlsx")))
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        self.assertIn('<t xml:space="preserve">-5</t>', sheet)
+        self.assertNotIn("'", sheet.split("<sheetData>")[1])
+
+    def test_xlsx_is_a_valid_workbook(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.export("xlsx")))
+        self.assertIsNone(archive.testzip())
+        for name in archive.namelist():
+            ElementTree.fromstring(archive.read(name))
+
+        namespace = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+        header, row = [
+            ["".join(cell.itertext()) for cell in row.findall("s:c", namespace)]
+            for row in sheet.iterfind(".//s:row", namespace)
+        ]
+        values = dict(zip(header, row))
+        self.assertEqual(values["First Name"], '=HYPERLINK("http://evil")')
+        self.assertEqual(values["About"], "Ünïcode & <tags>")
+
+
+class NotificationPayloadTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor()
+        self.position = create_position(self.professor)
+        self.client = APIClient()
+        self.client.force_authenticate(self.professor.user)
+
+    def notify_without_payloads(self, count):
+        for i in range(count):
+            student = create_student(f"student{Student.objects.count()}@example.com")
+            request = Request.objects.create(
+                student=student, position=self.position, cover_letter="c"
+            )
+            notifications.bulk_notify(
+                [
+                    ((request,), self.professor.user, 1),
+                    ((student,), self.professor.user, 2),
+                ]
+            )
+        Notification.objects.update(payload=None, payload_version=0)
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/eduportal/notifications/")
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()
+
+    def test_rows_without_payloads_are_rendered_in_constant_queries(self):
+        self.notify_without_payloads(1)
+        few, _ = self.list_queries()
+        self.notify_without_payloads(4)
+        many, body = self.list_queries()
+
+        self.assertEqual(few, many)
+        self.assertEqual(len(body), 10)
+        request_notification = next(row for row in body if row["position"])
+        self.assertEqual(request_notification["position"]["id"], self.position.pk)
+        self.assertIsNotNone(request_notification["student"]["user"])
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.failures = 0
+        outbox.handler("test.record")(self.record)
+        self.addCleanup(outbox.HANDLERS.pop, "test.record")
+
+    def record(self, value):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("handler failed")
+        self.calls.append(value)
+
+    @override_settings(OUTBOX_EAGER=False)
+    def test_publish_records_event_in_callers_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            outbox.publish("test.record", value=1)
+            event = OutboxEvent.objects.get()
+
+        self.assertEqual((event.topic, event.payload), ("test.record", {"value": 1}))
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.calls, [])
+
+    @override_settings(OUTBOX_EAGER=True)
+    def test_rolled_back_publish_leaves_nothing_behind(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                outbox.publish("test.record", value=1)
+                raise RuntimeError
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(self.calls, [])
+
+    @override_settings(OUTBOX_EAGER=True)
+    def test_eager_publish_drains_event_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.publish("test.record", value=1)
+            self.assertTrue(OutboxEvent.objects.exists())
+            self.assertEqual(self.calls, [])
+
+        self.assertEqual(self.calls, [1])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @override_settings(OUTBOX_EAGER=True)
+    def test_eager_publish_drains_only_its_own_event(self):
+        waiting = OutboxEvent.objects.create(topic="test.record", payload={"value": 0})
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.publish("test.record", value=1)
+
+        self.assertEqual(self.calls, [1])
+        self.assertQuerySetEqual(OutboxEvent.objects.all(), [waiting])
+
+    @override_settings(OUTBOX_EAGER=False)
+    def test_dispatch_runs_and_deletes_due_events(self):
+        outbox.publish("test.record", value=1)
+        outbox.publish("test.record", value=2)
+
+        self.assertEqual(outbox.dispatch(), (2, 0))
+        self.assertEqual(self.calls, [1, 2])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @override_settings(OUTBOX_EAGER=True)
+    def test_failing_handler_leaves_event_for_retry(self):
+        self.failures = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.publish("test.record", value=1)
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("handler failed", event.last_error)
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertEqual(outbox.dispatch(), (0, 0))
+
+        OutboxEvent.objects.update(available_at=timezone.now())
+        self.assertEqual(outbox.dispatch(), (1, 0))
+        self.assertEqual(self.calls, [1])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    @override_settings(OUTBOX_EAGER=False, OUTBOX_MAX_ATTEMPTS=2)
+    def test_dispatch_gives_up_after_max_attempts(self):
+        self.failures = 2
+        outbox.publish("test.record", value=1)
+        for _ in range(2):
+            self.assertEqual(outbox.dispatch(), (0, 1))
+            OutboxEvent.objects.update(available_at=timezone.now())
+
+        self.assertEqual(outbox.dispatch(), (0, 0))
+        self.assertEqual(OutboxEvent.objects.get().attempts, 2)
+        self.assertEqual(self.calls, [])
+
+
+class NotificationCounterTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor()
+        self.user = self.professor.user
+        self.position = create_position(self.professor)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, count, **fields):
+        created = notifications.bulk_notify(
+            [((self.position,), self.user, 1) for _ in range(count)]
+        )
+        Notification.objects.filter(pk__in=[n.pk for n in created]).update(**fields)
+        return created
+
+    def assertCountersMatchRows(self):
+        rows = notifications.count_by_user(Notification.objects.filter(user=self.user))
+        self.assertEqual(
+            notifications.get_counts(self.user), rows.get(self.user.pk, (0, 0))
+        )
+
+    def test_destroy_uncounts_notification(self):
+        read, unread = self.notify(1, read=True) + self.notify(1)
+        NotificationCounter.objects.filter(user=self.user).update(unread=1)
+
+        for notification in (read, unread):
+            response = self.client.delete(
+                f"/eduportal/notifications/{notification.pk}/"
+            )
+            self.assertEqual(response.status_code, 204)
+            self.assertCountersMatchRows()
+        self.assertEqual(notifications.get_counts(self.user), (0, 0))
+
+    def test_delete_all_keeps_bookmarked_notifications_counted(self):
+        self.notify(3)
+        self.notify(2, read=True)
+        NotificationCounter.objects.filter(user=self.user).update(unread=3)
+        self.notify(1, bookmarked=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/eduportal/notifications/delete_all/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("5 unbookmarked", response.json()["detail"])
+        self.assertEqual(notifications.get_counts(self.user), (1, 1))
+        self.assertCountersMatchRows()
+        counter_updates = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith("UPDATE")
+            and NotificationCounter._meta.db_table in query["sql"]
+        ]
+        self.assertEqual(len(counter_updates), 1)
+
+    def test_queryset_delete_uncounts_notifications(self):
+        self.notify(2)
+        Notification.objects.filter(user=self.user).delete()
+        self.assertEqual(notifications.get_counts(self.user), (0, 0))
+
+    def test_deleting_position_keeps_counters_in_step(self):
+        self.notify(2)
+        self.position.delete()
+        self.assertCountersMatchRows()
+
+    def test_deleting_user_leaves_no_counter_behind(self):
+        self.user = create_student().user
+        self.notify(2)
+        self.user.delete()
+        self.assertFalse(NotificationCounter.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_prune_uncounts_deleted_notifications(self):
+        self.notify(2, read=True)
+        NotificationCounter.objects.filter(user=self.user).update(unread=0)
+        self.notify(1)
+        Notification.objects.update(
+            timestamp=timezone.now() - datetime.timedelta(days=365)
+        )
+
+        call_command("prune_notifications", days=30, stdout=io.StringIO())
+        self.assertEqual(notifications.get_counts(self.user), (1, 1))
+        self.assertCountersMatchRows()
+
+
+class NotificationConsumerTests(TransactionTestCase):
+    # database_sync_to_async closes old connections, which would end the
+    # transaction a TestCase wraps each test in.
+    def setUp(self):
+        self.professor = create_professor()
+        self.user = self.professor.user
+        position = create_position(self.professor)
+        self.notifications = notifications.bulk_notify(
+            [((position,), self.user, 1) for _ in range(4)]
+        )
+
+    def connect(self, path):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), path)
+        communicator.scope["user"] = self.user
+        return communicator
+
+    def test_replay_then_live_events_committed_out_of_order(self):
+        first, late, replayed, last = [n.pk for n in self.notifications]
+        # `late` was committed after the replay query ran, so it isn't
+        # replayed even though its id is lower than the last replayed one.
+        Notification.objects.filter(pk=late).delete()
+
+        async def main():
+            communicator = self.connect(f"/ws/notifications/?since={first}")
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            replay = await communicator.receive_json_from()
+
+            await get_channel_layer().group_send(
+                f"notification_{self.user.pk}",
+                {
+                    "type": "send_notification",
+                    "messages": [{"id": late}, {"id": last}],
+                },
+            )
+            live = await communicator.receive_json_from()
+            await get_channel_layer().group_send(
+                f"notification_{self.user.pk}",
+                {"type": "send_notification", "message": {"id": replayed}},
+            )
+            nothing = await communicator.receive_nothing()
+            await communicator.disconnect()
+            return replay, live, nothing
+
+        replay, live, nothing = async_to_sync(main)()
+        self.assertEqual([m["id"] for m in replay["notifications"]], [replayed, last])
+        self.assertFalse(replay["has_more"])
+        self.assertEqual(live, {"id": late})
+        self.assertTrue(nothing)
+
+    def test_without_since_every_live_event_is_sent(self):
+        async def main():
+            communicator = self.connect("/ws/notifications/")
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await get_channel_layer().group_send(
+                f"notification_{self.user.pk}",
+                {"type": "send_notification", "message": {"id": 1}},
+            )
+            message = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return message
+
+        self.assertEqual(async_to_sync(main)(), {"id": 1})
+
+
+class ChatSummaryTests(TestCase):
+    def setUp(self):
+        self.professor = create_professor().user
+        self.student = create_student().user
+        self.chat = ChatSystem.objects.create(group_name=" ", start_chat=True)
+        self.chat.participants.add(self.professor, self.student)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def send(self, user, text):
+        response = self.client_for(user).post(
+            "/eduportal/create_message/",
+            {"text": text, "related_chat_group": self.chat.pk},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return Message.objects.latest("id")
+
+    def chat_summary(self, user):
+        response = self.client_for(user).get("/eduportal/chat_list/")
+        self.assertEqual(response.status_code, 200)
+        [chat] = response.json()
+        return chat
+
+    def unread(self, user):
+        counter = ChatUnreadCounter.objects.filter(chat=self.chat, user=user).first()
+        return counter.count if counter else 0
+
+    def test_send_updates_summary_and_recipient_unread_count(self):
+        self.send(self.student, "Hello, professor")
+
+        summary = self.chat_summary(self.professor)
+        self.assertEqual(summary["part_of_last_message"], "Hello, professor")
+        self.assertEqual(summary["person_of_the_last_message"], "StuDent")
+        self.assertIsNotNone(summary["time_of_the_last_message"])
+        self.assertTrue(summary["unseen_messages_flag"])
+        self.assertFalse(self.chat_summary(self.student)["unseen_messages_flag"])
+        self.assertEqual(
+            (self.unread(self.professor), self.unread(self.student)), (1, 0)
+        )
+
+        self.send(self.professor, "x" * 80)
+        self.chat.refresh_from_db()
+        self.assertEqual(self.chat.last_message_preview, "x" * 50)
+        self.assertEqual(self.chat.last_message_user, self.professor)
+        self.assertEqual(
+            (self.unread(self.professor), self.unread(self.student)), (1, 1)
+        )
+
+    def test_edit_updates_preview_of_last_message_only(self):
+        first = self.send(self.student, "first")
+        last = self.send(self.professor, "last")
+        client = self.client_for(self.student)
+
+        response = client.patch(
+            f"/eduportal/edit_message/{first.pk}/", {"text": "first, edited"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.chat_summary(self.student)["part_of_last_message"], "last"
+        )
+
+        response = self.client_for(self.professor).patch(
+            f"/eduportal/edit_message/{last.pk}/", {"text": "last, edited"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.chat_summary(self.student)["part_of_last_message"], "last, edited"
+        )
+
+    def test_deleting_last_message_recomputes_summary(self):
+        first = self.send(self.student, "first")
+        last = self.send(self.professor, "last")
+
+        response = self.client_for(self.professor).delete(
+            f"/eduportal/delete_message/{last.pk}/"
+        )
+        self.assertEqual(response.status_code, 204)
+        self.chat.refresh_from_db()
+        self.assertEqual(self.chat.last_message, first)
+        self.assertEqual(self.chat.last_message_user, self.student)
+        self.assertEqual(self.chat.last_message_time, first.send_time)
+        self.assertEqual(self.chat.last_message_preview, "first")
+        self.assertEqual(self.unread(self.student), 0)
+        self.assertEqual(self.unread(self.professor), 1)
+
+        response = self.client_for(self.student).delete(
+            f"/eduportal/delete_message/{first.pk}/"
+        )
+        self.assertEqual(response.status_code, 204)
+        summary = self.chat_summary(self.professor)
+        self.assertIsNone(summary["part_of_last_message"])
+        self.assertIsNone(summary["time_of_the_last_message"])
+        self.assertIsNone(summary["person_of_the_last_message"])
+        self.assertFalse(summary["unseen_messages_flag"])
+
+    def test_deleting_older_message_keeps_summary(self):
+        first = self.send(self.student, "first")
+        self.send(self.professor, "last")
+
+        first.delete()
+        self.chat.refresh_from_db()
+        self.assertEqual(self.chat.last_message_preview, "last")
+        self.assertEqual(self.unread(self.professor), 0)
+
+    def test_mark_seen_clears_only_readers_unread_count(self):
+        self.send(self.student, "first")
+        self.send(self.professor, "second")
+
+        response = self.client_for(self.professor).get(
+            f"/eduportal/message_last_seen_update/{self.chat.pk}/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (self.unread(self.professor), self.unread(self.student)), (0, 1)
+        )
+        self.assertFalse(self.chat_summary(self.professor)["unseen_messages_flag"])
+        self.assertTrue(self.chat_summary(self.student)["unseen_messages_flag"])
+        self.assertTrue(Message.objects.get(text="first").seen_flag)
+        self.assertFalse(Message.objects.get(text="second").seen_flag)
+
+        # A seen message no longer counts when it is deleted.
+        self.send(self.student, "third")
+        Message.objects.get(text="first").delete()
+        self.assertEqual(self.unread(self.professor), 1)
+
+
+@override_settings(PRESENCE_TRACKING=True, PRESENCE_TIMEOUT=90)
+class PresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def connected(self, group):
+        async_to_sync(presence.connected)(group)
+
+    def disconnected(self, group):
+        async_to_sync(presence.disconnected)(group)
+
+    def test_group_is_online_while_a_socket_is_open(self):
+        self.assertFalse(presence.is_online("chat_1"))
+        self.connected("chat_1")
+        self.connected("chat_1")
+        self.disconnected("chat_1")
+        self.assertTrue(presence.is_online("chat_1"))
+
+        self.disconnected("chat_1")
+        self.assertFalse(presence.is_online("chat_1"))
+        # The zero count is left to expire, so a socket connecting meanwhile
+        # is still counted.
+        self.assertEqual(cache.get(presence.presence_key("chat_1")), 0)
+        self.connected("chat_1")
+        self.assertTrue(presence.is_online("chat_1"))
+
+    def test_counts_expire_without_heartbeats(self):
+        self.connected("chat_1")
+        self.connected("chat_2")
+        later = time.time() + 60
+        with mock.patch("time.time", return_value=later):
+            async_to_sync(presence.heartbeat)("chat_2")
+        with mock.patch("time.time", return_value=later + 60):
+            self.assertEqual(presence.online(["chat_1", "chat_2"]), {"chat_2"})
+
+    def test_connect_after_extra_disconnects_counts_as_online(self):
+        self.connected("chat_1")
+        self.disconnected("chat_1")
+        self.disconnected("chat_1")
+        self.connected("chat_1")
+        self.assertTrue(presence.is_online("chat_1"))
+
+    @override_settings(PRESENCE_HEARTBEAT_INTERVAL=0)
+    def test_heartbeats_survive_failures(self):
+        consumer = PresenceMixin()
+        consumer.group_name = "chat_1"
+        consumer.channel_name = "specific.test"
+        consumer.channel_layer = mock.Mock(
+            group_add=mock.AsyncMock(side_effect=[OperationalError, None, None])
+        )
+
+        async def main():
+            task = asyncio.create_task(consumer.send_heartbeats())
+            while consumer.channel_layer.group_add.await_count < 3:
+                await asyncio.sleep(0)
+            task.cancel()
+
+        with mock.patch.object(
+            presence,
+            "heartbeat",
+            mock.AsyncMock(side_effect=[RuntimeError, None, None]),
+        ) as heartbeat, self.assertLogs("eduportal.consumers", "ERROR") as logs:
+            async_to_sync(main)()
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(heartbeat.await_count, 3)
+
+    @override_settings(PRESENCE_TRACKING=False)
+    def test_everyone_is_online_without_tracking(self):
+        self.assertEqual(presence.online(["chat_1"]), {"chat_1"})
+
+    def test_pushes_skip_users_without_sockets(self):
+        professor = create_professor()
+        position = create_position(professor)
+        student = create_student()
+        self.connected(f"notification_{student.user_id}")
+
+        with mock.patch.object(notifications, "send_events") as send_events:
+            with self.captureOnCommitCallbacks(execute=True):
+                notifications.bulk_notify(
+                    [
+                        ((position,), student.user, 1),
+                        ((position,), professor.user, 1),
+                    ]
+                )
+
+        [(events,), _] = send_events.call_args
+        self.assertEqual(list(events), [f"notification_{student.user_id}"])
+
+    def test_chat_messages_skip_chats_without_sockets(self):
+        professor = create_professor().user
+        student = create_student().user
+        chat = ChatSystem.objects.create(group_name=" ", start_chat=True)
+        chat.participants.add(professor, student)
+        layer = mock.Mock(group_send=mock.AsyncMock())
+
+        with mock.patch(
+            "eduportal.signals.handlers.get_channel_layer", return_value=layer
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                Message.objects.create(
+                    text="unheard", related_chat_group=chat, user=student
+                )
+            self.connected(f"chat_{chat.pk}")
+            with self.captureOnCommitCallbacks(execute=True):
+                Message.objects.create(
+                    text="heard", related_chat_group=chat, user=professor
+                )
+
+        [(group, event), _] = layer.group_send.call_args
+        self.assertEqual(layer.group_send.call_count, 1)
+        self.assertEqual(group, f"chat_{chat.pk}")
+        self.assertEqual(event["message"]["text"], "heard")
@@ -0,0 +1,119 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from eduportal.models import Position, Professor, Request, Student
+from eduportal.utils import landing, leaderboard, outbox
+from ticketing_system.models import ChatSystem
+
+
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+NOT_FOUND = "not_found"
+INVALID_STATUS = "invalid_status"
+POSITION_FILLED = "position_filled"
+
+PROFESSOR_RESPONSES = {"PA": ACCEPTED, "PR": REJECTED}
+
+
+def professor_respond(professor, request_ids, new_status):
+    # Applies the professor's answer to many pending requests at once. Rows
+    # are locked up front, so the capacity check and the status updates below
+    # see the same state; requests are accepted in the order they were given.
+    # Positions are locked before requests, the order the single-request views
+    # update them in, so a bulk and a single answer can't deadlock.
+    success = PROFESSOR_RESPONSES[new_status]
+    order = {pk: i for i, pk in enumerate(request_ids)}
+    results = {pk: NOT_FOUND for pk in order}
+
+    with transaction.atomic():
+        owned = Request.objects.filter(pk__in=order, position__professor=professor)
+        positions = {
+            pos.pk: pos
+            for pos in Position.objects.select_for_update()
+            .filter(pk__in=owned.values("position_id"))
+            .order_by("pk")
+        }
+        requests = sorted(
+            owned.select_related("student__user").select_for_update(of=("self",)),
+            key=lambda req: order[req.pk],
+        )
+
+        chosen = []
+        for req in requests:
+            if req.status != "PP":
+                results[req.pk] = INVALID_STATUS
+            else:
+                chosen.append(req)
+
+        if new_status == "PA":
+            chosen = take_free_seats(chosen, results, positions)
+
+        Request.objects.filter(pk__in=[req.pk for req in chosen]).update(
+            status=new_status
+        )
+        for req in chosen:
+            req.status = new_status
+            results[req.pk] = success
+
+        if new_status == "PA":
+            open_chats(professor, chosen)
+        if chosen:
+            record_responses(professor, chosen, new_status)
+
+    return results
+
+
+def record_responses(professor, requests, new_status):
+    # What the request_status_changed receivers do for one request, done once
+    # for the whole answer: one outbox event, one leaderboard refresh and one
+    # landing page invalidation.
+    outbox.publish(
+        "request.status_changed",
+        requests=[req.pk for req in requests],
+        old_status="PP",
+        status=new_status,
+    )
+    leaderboard.refresh_students(
+        Student.objects.filter(pk__in={req.student_id for req in requests})
+    )
+    leaderboard.refresh_professors(Professor.objects.filter(pk=professor.pk))
+    transaction.on_commit(landing.mark_stale)
+
+
+def take_free_seats(requests, results, positions):
+    free = {pk: pos.capacity - pos.filled for pk, pos in positions.items()}
+
+    accepted = []
+    for req in requests:
+        if free[req.position_id] > 0:
+            free[req.position_id] -= 1
+            accepted.append(req)
+        else:
+            results[req.pk] = POSITION_FILLED
+
+    seats = Counter(req.position_id for req in accepted)
+    if seats:
+        Position.objects.filter(pk__in=seats).update(
+            filled=F("filled")
+            + Case(
+                *[When(pk=pk, then=Value(count)) for pk, count in seats.items()],
+                default=Value(0),
+            )
+        )
+    return accepted
+
+
+def open_chats(professor, requests):
+    chats = ChatSystem.objects.bulk_create(
+        [ChatSystem(group_name=" ") for _ in requests]
+    )
+    Participant = ChatSystem.participants.through
+    Participant.objects.bulk_create(
+        [
+            Participant(chatsystem_id=chat.pk, user_id=user_id)
+            for chat, req in zip(chats, requests)
+            for user_id in (professor.user_id, req.student.user_id)
+        ]
+    )
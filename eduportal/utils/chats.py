@@ -0,0 +1,78 @@
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from ticketing_system.models import ChatSystem, ChatUnreadCounter, Message
+
+
+PREVIEW_LENGTH = 50
+
+
+def record_message(message):
+    # A new message becomes its chat's summary, unless a newer one already is,
+    # and counts as unread for every other participant.
+    ChatSystem.objects.filter(pk=message.related_chat_group_id).filter(
+        Q(last_message__isnull=True) | Q(last_message__lt=message.pk)
+    ).update(**summary_fields(message))
+    add_unread(message.related_chat_group_id, recipients(message), 1)
+
+
+def update_message(message):
+    ChatSystem.objects.filter(last_message=message).update(
+        last_message_preview=message.text[:PREVIEW_LENGTH]
+    )
+
+
+def forget_message(message):
+    chat_id = message.related_chat_group_id
+    if not message.seen_flag:
+        add_unread(chat_id, recipients(message), -1)
+    # Deleting the newest message has already cleared last_message.
+    if ChatSystem.objects.filter(pk=chat_id, last_message__isnull=True).exists():
+        latest = Message.objects.filter(related_chat_group_id=chat_id).order_by("-id")
+        ChatSystem.objects.filter(pk=chat_id).update(**summary_fields(latest.first()))
+
+
+def mark_seen(chat_id, user):
+    ChatUnreadCounter.objects.filter(chat_id=chat_id, user=user).update(count=0)
+
+
+def summary_fields(message):
+    if message is None:
+        return {
+            "last_message_id": None,
+            "last_message_user_id": None,
+            "last_message_time": None,
+            "last_message_preview": "",
+        }
+    return {
+        "last_message_id": message.pk,
+        "last_message_user_id": message.user_id,
+        "last_message_time": message.send_time,
+        "last_message_preview": message.text[:PREVIEW_LENGTH],
+    }
+
+
+def recipients(message):
+    return list(
+        ChatSystem.participants.through.objects.filter(
+            chatsystem_id=message.related_chat_group_id
+        )
+        .exclude(user_id=message.user_id)
+        .values_list("user_id", flat=True)
+    )
+
+
+def add_unread(chat_id, user_ids, delta):
+    if not user_ids:
+        return
+    if delta > 0:
+        ChatUnreadCounter.objects.bulk_create(
+            [
+                ChatUnreadCounter(chat_id=chat_id, user_id=user_id)
+                for user_id in user_ids
+            ],
+            ignore_conflicts=True,
+        )
+    ChatUnreadCounter.objects.filter(chat_id=chat_id, user_id__in=user_ids).update(
+        count=Greatest(F("count") + delta, 0)
+    )
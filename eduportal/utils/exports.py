@@ -0,0 +1,207 @@
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from eduportal.models import Request
+from eduportal.utils.field_choices import EmploymentStatusChoices, MajorTypeChoices
+
+
+CHUNK_SIZE = 2000
+
+APPLICANT_COLUMNS = [
+    ("Request ID", "id"),
+    ("Position ID", "position_id"),
+    ("Position", "position__title"),
+    ("Status", "status"),
+    ("Applied At", "date_applied"),
+    ("First Name", "student__user__first_name"),
+    ("Last Name", "student__user__last_name"),
+    ("Email", "student__user__email"),
+    ("University", "student__university__name"),
+    ("Major", "student__major"),
+    ("GPA", "student__avg_grade"),
+    ("CV Title", "student__cv__title"),
+    ("Employment Status", "student__cv__employment_status"),
+    ("About", "student__cv__about"),
+]
+
+DISPLAY_VALUES = {
+    "status": dict(Request.REQUEST_STATUS),
+    "student__major": dict(MajorTypeChoices.choices),
+    "student__cv__employment_status": dict(EmploymentStatusChoices.choices),
+}
+
+# Spreadsheet apps run CSV text starting with these as a formula.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Control characters are not allowed anywhere in an XML document.
+INVALID_XML_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+# Rows -------------------------------------------------------------------------
+
+
+def applicant_rows(queryset):
+    fields = [field for _, field in APPLICANT_COLUMNS]
+    rows = queryset.order_by("position_id", "id").values(*fields)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [display_value(field, row[field]) for field in fields]
+
+
+def display_value(field, value):
+    if field in DISPLAY_VALUES:
+        return DISPLAY_VALUES[field].get(value, value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+# CSV --------------------------------------------------------------------------
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    # The BOM makes Excel open the file as UTF-8.
+    yield "\ufeff" + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(
+            ["" if value is None else escape_formula(value) for value in row]
+        )
+
+
+def escape_formula(value):
+    # Student-written text must open as text, not run as a formula. XLSX
+    # inline strings are never evaluated, so only CSV needs this.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+# XLSX -------------------------------------------------------------------------
+
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" '
+    'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    "</Types>"
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/'
+    'relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    "</Relationships>"
+)
+
+SHEET_START_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+
+SHEET_END_XML = "</sheetData></worksheet>"
+
+
+class ChunkBuffer:
+    # A write-only, non-seekable file object; zipfile then emits data
+    # descriptors instead of seeking back, so the archive can be streamed.
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_xlsx(header, rows, sheet_name="Sheet1"):
+    buffer = ChunkBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        archive.writestr("_rels/.rels", ROOT_RELS_XML)
+        archive.writestr(
+            "xl/workbook.xml", WORKBOOK_XML.format(sheet_name=escape(sheet_name))
+        )
+        archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS_XML)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(SHEET_START_XML.encode())
+            sheet.write(xlsx_row(header).encode())
+            for row in rows:
+                sheet.write(xlsx_row(row).encode())
+                if buffer.chunks:
+                    yield buffer.drain()
+            sheet.write(SHEET_END_XML.encode())
+    yield buffer.drain()
+
+
+def xlsx_row(values):
+    return "<row>{}</row>".format("".join(xlsx_cell(value) for value in values))
+
+
+def xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    text = escape(INVALID_XML_RE.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+# Exports ----------------------------------------------------------------------
+
+
+EXPORT_FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8", "csv"),
+    "xlsx": (
+        stream_xlsx,
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "xlsx",
+    ),
+}
+
+
+def export_applicants(queryset, file_format):
+    stream, content_type, extension = EXPORT_FORMATS[file_format]
+    header = [title for title, _ in APPLICANT_COLUMNS]
+    return stream(header, applicant_rows(queryset)), content_type, extension
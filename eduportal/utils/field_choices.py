@@ -113,6 +113,12 @@ class NotificationTypeChoices(models.IntegerChoices):
     NEW_TAGGED_POST = 4
 
 
+class SeasonChoices(models.IntegerChoices):
+    SPRING = 1
+    SUMMER = 2
+    WINTER = 3
+
+
 class MajorTypeChoices(models.IntegerChoices):
     COMPUTER_ENGINEERING = 1 
     SOFTWARE_ENGINEERING = 2 
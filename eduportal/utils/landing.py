@@ -0,0 +1,199 @@
+import threading
+import time
+from random import sample
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import DailySignup
+from eduportal.models import Position, Professor, Student, University
+from eduportal.serializers import (
+    LandingProfessorSerializer,
+    LandingStudentSerializer,
+    LandingUniversitySerializer,
+    ProfessorPositionListSerializer,
+    StudentPositionListSerializer,
+)
+from eduportal.utils import leaderboard
+from eduportal.utils.sampling import sample_queryset
+
+
+SNAPSHOT_KEY = "landing:snapshot"
+DIRTY_KEY = "landing:dirty"
+REBUILD_LOCK_KEY = "landing:rebuilding"
+BUILD_LOCK_KEY = "landing:building"
+
+RANDOM_UNIVERSITY_COUNT = 18
+RANDOM_POSITION_COUNT = 4
+PROFESSOR_VIEW_POSITION_COUNT = 2
+
+UNIVERSITY_FIELDS = ["id", "name", "icon", "rank"]
+
+
+# Snapshot building ------------------------------------------------------------
+
+
+def build_snapshot():
+    top_professors = leaderboard.top_professors(3)
+    top_students = leaderboard.top_students(3)
+
+    top_universities = University.objects.only(*UNIVERSITY_FIELDS).order_by("rank")[:3]
+    university_pool = sample_queryset(
+        University.objects.only(*UNIVERSITY_FIELDS),
+        settings.LANDING_UNIVERSITY_POOL_SIZE,
+    )
+
+    position_pool = sample_queryset(
+        Position.objects.filter(professor__in=top_professors)
+        .select_related("professor", "professor__user", "professor__university")
+        .prefetch_related("tags", "tags2"),
+        settings.LANDING_POSITION_POOL_SIZE,
+    )
+
+    return {
+        "built_at": time.time(),
+        "professor_count": Professor.objects.count(),
+        "student_count": Student.objects.count(),
+        "growth": calculate_growth(),
+        "top_universities": LandingUniversitySerializer(
+            top_universities, many=True
+        ).data,
+        "top_professors": LandingProfessorSerializer(top_professors, many=True).data,
+        "top_students": LandingStudentSerializer(top_students, many=True).data,
+        "university_pool": LandingUniversitySerializer(university_pool, many=True).data,
+        "position_pool": [
+            {
+                "professor_view": ProfessorPositionListSerializer(pos).data,
+                "student_view": StudentPositionListSerializer(pos).data,
+            }
+            for pos in position_pool
+        ],
+    }
+
+
+def calculate_growth():
+    site_creation_day = DailySignup.objects.aggregate(first=Min("day"))["first"]
+    today = timezone.localdate()
+    if site_creation_day is None:
+        site_creation_day = today
+
+    delta = (today - site_creation_day) / 4
+    date_points = [site_creation_day + i * delta for i in range(1, 5)]
+
+    return list(zip(date_points, DailySignup.objects.cumulative_counts(date_points)))
+
+
+# Snapshot access --------------------------------------------------------------
+
+
+def get_snapshot():
+    snapshot = cache.get(SNAPSHOT_KEY)
+    age = snapshot_age(snapshot) if snapshot else None
+
+    if snapshot is None or age > settings.LANDING_SNAPSHOT_MAX_AGE:
+        return build_cold_snapshot()
+
+    if age > settings.LANDING_SNAPSHOT_REFRESH_INTERVAL or cache.get(DIRTY_KEY):
+        schedule_rebuild()
+
+    return snapshot
+
+
+def build_cold_snapshot():
+    # Only one request builds a missing snapshot; the others wait for it a
+    # little and then make do with the counts.
+    if cache.add(BUILD_LOCK_KEY, True, timeout=settings.LANDING_SNAPSHOT_BUILD_TIMEOUT):
+        try:
+            return rebuild_snapshot()
+        finally:
+            cache.delete(BUILD_LOCK_KEY)
+
+    deadline = time.monotonic() + settings.LANDING_SNAPSHOT_COLD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        snapshot = cache.get(SNAPSHOT_KEY)
+        if snapshot and snapshot_age(snapshot) <= settings.LANDING_SNAPSHOT_MAX_AGE:
+            return snapshot
+    return minimal_snapshot()
+
+
+def snapshot_age(snapshot):
+    return time.time() - snapshot["built_at"]
+
+
+def minimal_snapshot():
+    return {
+        "built_at": time.time(),
+        "professor_count": Professor.objects.count(),
+        "student_count": Student.objects.count(),
+        "growth": [],
+        "top_universities": [],
+        "top_professors": [],
+        "top_students": [],
+        "university_pool": [],
+        "position_pool": [],
+    }
+
+
+def rebuild_snapshot():
+    cache.delete(DIRTY_KEY)
+    snapshot = build_snapshot()
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+    return snapshot
+
+
+def render_snapshot(snapshot):
+    positions = sample_pool(snapshot["position_pool"], RANDOM_POSITION_COUNT)
+
+    return {
+        "professor_count": snapshot["professor_count"],
+        "student_count": snapshot["student_count"],
+        "growth": snapshot["growth"],
+        "random_universities": sample_pool(
+            snapshot["university_pool"], RANDOM_UNIVERSITY_COUNT
+        ),
+        "top_universities": snapshot["top_universities"],
+        "top_professors": snapshot["top_professors"],
+        "top_students": snapshot["top_students"],
+        "professor_view_positions": [
+            pos["professor_view"] for pos in positions[:PROFESSOR_VIEW_POSITION_COUNT]
+        ],
+        "student_view_positions": [
+            pos["student_view"] for pos in positions[PROFESSOR_VIEW_POSITION_COUNT:]
+        ],
+    }
+
+
+def sample_pool(pool, count):
+    if len(pool) >= count:
+        return sample(pool, count)
+    return pool
+
+
+# Background refresh -----------------------------------------------------------
+
+
+def mark_stale():
+    cache.set(DIRTY_KEY, True, timeout=None)
+    schedule_rebuild()
+
+
+def schedule_rebuild():
+    if not cache.add(REBUILD_LOCK_KEY, True, timeout=settings.LANDING_SNAPSHOT_MAX_AGE):
+        return
+    threading.Thread(target=_rebuild_in_background, daemon=True).start()
+
+
+def _rebuild_in_background():
+    try:
+        while True:
+            time.sleep(settings.LANDING_SNAPSHOT_DEBOUNCE)
+            rebuild_snapshot()
+            if not cache.get(DIRTY_KEY):
+                break
+    finally:
+        cache.delete(REBUILD_LOCK_KEY)
+        connection.close()
@@ -0,0 +1,87 @@
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from eduportal.models import (
+    EducationHistory,
+    Professor,
+    ProjectExperience,
+    Request,
+    Student,
+)
+
+
+PROFESSOR_ACCEPTED_STATUSES = ["SA"]
+STUDENT_ACCEPTED_STATUSES = ["PA", "SA", "SR"]
+
+
+def _subquery_count(queryset, group_by):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        Value(0),
+    )
+
+
+def refresh_professors(queryset):
+    return queryset.update(
+        accepted_request_count=_subquery_count(
+            Request.objects.filter(
+                position__professor=OuterRef("pk"),
+                status__in=PROFESSOR_ACCEPTED_STATUSES,
+            ),
+            "position__professor",
+        ),
+        project_count=_subquery_count(
+            ProjectExperience.objects.filter(cv__professor=OuterRef("pk")),
+            "cv",
+        ),
+    )
+
+
+def refresh_students(queryset):
+    return queryset.update(
+        accepted_request_count=_subquery_count(
+            Request.objects.filter(
+                student=OuterRef("pk"),
+                status__in=STUDENT_ACCEPTED_STATUSES,
+            ),
+            "student",
+        ),
+        avg_grade=Coalesce(
+            Subquery(
+                EducationHistory.objects.filter(
+                    cv__student=OuterRef("pk"), end_date__isnull=False
+                )
+                .order_by()
+                .values("cv")
+                .annotate(average=Avg("grade"))
+                .values("average")
+            ),
+            Value(0.0),
+        ),
+    )
+
+
+def top_professors(count):
+    professors = Professor.objects.select_related("user").order_by(
+        "-accepted_request_count", "id"
+    )
+    return ranked(professors[:count])
+
+
+def top_students(count):
+    students = Student.objects.select_related("user").order_by(
+        "-accepted_request_count", "id"
+    )
+    return ranked(students[:count])
+
+
+def ranked(queryset):
+    items = list(queryset)
+    for i, item in enumerate(items, start=1):
+        item.rank = i
+    return items
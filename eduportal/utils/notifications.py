@@ -0,0 +1,247 @@
+import asyncio
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from eduportal.models import (
+    Notification,
+    NotificationCounter,
+    NotificationItem,
+    Student,
+)
+from eduportal.serializers import NotificationSerializer, notification_payload
+from eduportal.utils import presence
+from eduportal.utils.field_choices import NotificationTypeChoices
+
+
+NEW_TAGGED_POST = NotificationTypeChoices.NEW_TAGGED_POST
+
+
+def bulk_notify(entries):
+    # Bulk counterpart of creating one Notification per object in the signal
+    # handlers: `entries` are (related objects, user, notification type)
+    # tuples. bulk_create sends no post_save, so the websocket push is queued
+    # here.
+    if not entries:
+        return []
+
+    notifications = Notification.objects.bulk_create(
+        [
+            Notification(
+                user=user,
+                notification_type=notification_type,
+                **notification_payload(*objects),
+            )
+            for objects, user, notification_type in entries
+        ]
+    )
+    items = get_or_create_items([obj for objects, _, _ in entries for obj in objects])
+
+    Through = NotificationItem.notifications.through
+    Through.objects.bulk_create(
+        [
+            Through(notificationitem_id=items[item_key(obj)], notification_id=notif.pk)
+            for (objects, _, _), notif in zip(entries, notifications)
+            for obj in objects
+        ]
+    )
+
+    created = Counter(notif.user_id for notif in notifications)
+    adjust_counters({user_id: (count, count) for user_id, count in created.items()})
+    queue_push(notifications)
+    return notifications
+
+
+def notify_interested_students(position):
+    # Tells every student following one of the position's tags about it, a
+    # chunk of students at a time so huge audiences keep memory and query
+    # sizes bounded.
+    students = (
+        Student.objects.filter(interest_tags__position=position)
+        .distinct()
+        .select_related("user", "university")
+        .order_by("pk")
+    )
+    chunk_size = settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+    last_id = 0
+    total = 0
+
+    while True:
+        chunk = list(students.filter(pk__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        total += len(
+            bulk_notify(
+                [
+                    ((position, student), student.user, NEW_TAGGED_POST)
+                    for student in chunk
+                ]
+            )
+        )
+        last_id = chunk[-1].pk
+    return total
+
+
+def get_or_create_items(objects):
+    content_types = ContentType.objects.get_for_models(*{type(obj) for obj in objects})
+    object_ids = defaultdict(set)
+    for obj in objects:
+        object_ids[content_types[type(obj)].pk].add(obj.pk)
+
+    items = {}
+    for content_type_id, ids in object_ids.items():
+        for item in NotificationItem.objects.filter(
+            content_type_id=content_type_id, object_id__in=ids
+        ):
+            items[(item.content_type_id, item.object_id)] = item.pk
+
+    missing = [
+        NotificationItem(content_type_id=content_type_id, object_id=object_id)
+        for content_type_id, ids in object_ids.items()
+        for object_id in ids
+        if (content_type_id, object_id) not in items
+    ]
+    for item in NotificationItem.objects.bulk_create(missing):
+        items[(item.content_type_id, item.object_id)] = item.pk
+    return items
+
+
+def item_key(obj):
+    return (ContentType.objects.get_for_model(obj).pk, obj.pk)
+
+
+push_buffers = threading.local()
+
+
+@contextmanager
+def batched_pushes():
+    # Notifications queued inside the block are pushed together once the
+    # transaction commits, one frame per recipient. Blocks nest; a block that
+    # raises drops what was queued in it, like its rolled back savepoint.
+    stack = push_buffers.__dict__.setdefault("stack", [])
+    buffer = []
+    stack.append(buffer)
+    try:
+        yield
+    finally:
+        stack.pop()
+    if stack:
+        stack[-1].extend(buffer)
+    elif buffer:
+        transaction.on_commit(lambda: push_notifications(buffer))
+
+
+def queue_push(notifications):
+    stack = getattr(push_buffers, "stack", None)
+    if stack:
+        stack[-1].extend(notifications)
+    else:
+        transaction.on_commit(lambda: push_notifications(notifications))
+
+
+def push_notifications(notifications):
+    by_group = defaultdict(list)
+    for notification in notifications:
+        by_group[f"notification_{notification.user_id}"].append(notification)
+    online = presence.online(by_group)
+
+    events = {}
+    for group_name, group_notifications in by_group.items():
+        if group_name not in online:
+            continue
+        messages = NotificationSerializer(group_notifications, many=True).data
+        if len(messages) == 1:
+            events[group_name] = {"type": "send_notification", "message": messages[0]}
+        else:
+            events[group_name] = {"type": "send_notification", "messages": messages}
+    if events:
+        async_to_sync(send_events)(events)
+
+
+async def send_events(events):
+    channel_layer = get_channel_layer()
+    await asyncio.gather(
+        *[
+            channel_layer.group_send(group_name, event)
+            for group_name, event in events.items()
+        ]
+    )
+
+
+def get_counts(user):
+    counts = (
+        NotificationCounter.objects.filter(user=user)
+        .values_list("total", "unread")
+        .first()
+    )
+    return counts or (0, 0)
+
+
+def count_by_user(notifications):
+    return {
+        row["user_id"]: (row["total"], row["unread"])
+        for row in notifications.order_by()
+        .values("user_id")
+        .annotate(total=Count("id"), unread=Count("id", filter=Q(read=False)))
+    }
+
+
+counter_buffers = threading.local()
+
+
+@contextmanager
+def batched_counters():
+    # Counter changes made inside the block, e.g. by the post_delete receiver
+    # for every row of a bulk delete, are applied together when it exits.
+    stack = counter_buffers.__dict__.setdefault("stack", [])
+    buffer = defaultdict(lambda: (0, 0))
+    stack.append(buffer)
+    try:
+        yield
+    finally:
+        stack.pop()
+    if stack:
+        merge_deltas(stack[-1], buffer)
+    else:
+        adjust_counters(buffer)
+
+
+def merge_deltas(into, deltas):
+    for user_id, (total, unread) in deltas.items():
+        into[user_id] = (into[user_id][0] + total, into[user_id][1] + unread)
+
+
+def adjust_counters(deltas):
+    # `deltas` maps user ids to (total, unread) changes. Users with the same
+    # change share one UPDATE. Only new notifications create a missing
+    # counter, so a user being deleted doesn't get one back.
+    deltas = {user_id: delta for user_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    stack = getattr(counter_buffers, "stack", None)
+    if stack:
+        merge_deltas(stack[-1], deltas)
+        return
+
+    NotificationCounter.objects.bulk_create(
+        [
+            NotificationCounter(user_id=user_id)
+            for user_id, (total, _) in deltas.items()
+            if total > 0
+        ],
+        ignore_conflicts=True,
+    )
+    users_by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        users_by_delta[delta].append(user_id)
+    for (total, unread), user_ids in users_by_delta.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            total=F("total") + total, unread=F("unread") + unread
+        )
@@ -0,0 +1,73 @@
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from eduportal.models import OutboxEvent
+from eduportal.utils import notifications
+
+
+HANDLERS = {}
+
+MAX_RETRY_DELAY = 3600  # seconds
+
+
+def handler(topic):
+    def register(func):
+        HANDLERS[topic] = func
+        return func
+
+    return register
+
+
+def publish(topic, **payload):
+    # Records the event in the caller's transaction, which must be the one
+    # making the change, so the event exists exactly when the change was
+    # committed. In eager mode this process also drains the event right after
+    # the commit; if that fails, the row stays for `run_outbox` to retry.
+    event = OutboxEvent.objects.create(topic=topic, payload=payload)
+    if settings.OUTBOX_EAGER:
+        transaction.on_commit(lambda: dispatch(ids=[event.pk]), robust=True)
+
+
+def run(topic, payload):
+    with transaction.atomic(), notifications.batched_pushes():
+        HANDLERS[topic](**payload)
+
+
+def dispatch(batch_size=100, ids=None):
+    # Claims a batch of due events, skipping rows another dispatcher holds,
+    # and runs each in its own savepoint. Handled events are deleted; failed
+    # ones are retried later with exponential backoff until OUTBOX_MAX_ATTEMPTS.
+    # `ids` limits the batch to those events.
+    now = timezone.now()
+    events = OutboxEvent.objects.select_for_update(skip_locked=True).filter(
+        available_at__lte=now, attempts__lt=settings.OUTBOX_MAX_ATTEMPTS
+    )
+    if ids is not None:
+        events = events.filter(pk__in=ids)
+    with transaction.atomic(), notifications.batched_pushes():
+        events = list(events.order_by("available_at", "id")[:batch_size])
+
+        handled = []
+        failed = []
+        for event in events:
+            try:
+                run(event.topic, event.payload)
+            except Exception:
+                event.attempts += 1
+                event.available_at = now + timedelta(
+                    seconds=min(2**event.attempts, MAX_RETRY_DELAY)
+                )
+                event.last_error = traceback.format_exc()
+                failed.append(event)
+            else:
+                handled.append(event.pk)
+
+        OutboxEvent.objects.filter(pk__in=handled).delete()
+        OutboxEvent.objects.bulk_update(
+            failed, ["attempts", "available_at", "last_error"]
+        )
+    return len(handled), len(failed)
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Counts the open websockets of each channel-layer group, so pushes to groups
+# nobody is listening on can be skipped. Counts expire unless a socket keeps
+# sending heartbeats, which clears counts left behind by crashed workers. A
+# count that drops to 0 is left to expire as well: deleting it could race with
+# a socket connecting at the same moment.
+
+
+def presence_key(group):
+    return f"presence:{group}"
+
+
+async def connected(group):
+    key = presence_key(group)
+    if await cache.aadd(key, 1, timeout=settings.PRESENCE_TIMEOUT):
+        return
+    try:
+        count = await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, timeout=settings.PRESENCE_TIMEOUT)
+        return
+    if count < 1:
+        # More disconnects than connects were counted, e.g. after the count
+        # expired under open sockets; this socket is open all the same.
+        await cache.aset(key, 1, timeout=settings.PRESENCE_TIMEOUT)
+
+
+async def disconnected(group):
+    try:
+        await cache.adecr(presence_key(group))
+    except ValueError:
+        pass
+
+
+async def heartbeat(group):
+    key = presence_key(group)
+    if not await cache.atouch(key, timeout=settings.PRESENCE_TIMEOUT):
+        await cache.aadd(key, 1, timeout=settings.PRESENCE_TIMEOUT)
+
+
+def online(groups):
+    groups = list(groups)
+    if not settings.PRESENCE_TRACKING:
+        return set(groups)
+    counts = cache.get_many([presence_key(group) for group in groups])
+    return {group for group in groups if counts.get(presence_key(group), 0) > 0}
+
+
+def is_online(group):
+    return group in online([group])
@@ -0,0 +1,40 @@
+from random import randint, shuffle
+
+from django.db.models import Max, Min
+
+
+def sample_queryset(queryset, count, oversample=2, attempts=3):
+    # Draws random pks inside the queryset's pk range and fetches them with
+    # pk__in; misses caused by gaps are filled by seeking to the next pk after a
+    # random point, so every query is an index lookup rather than a full scan.
+    if count <= 0:
+        return []
+
+    bounds = queryset.aggregate(low=Min("pk"), high=Max("pk"))
+    low, high = bounds["low"], bounds["high"]
+    if low is None:
+        return []
+
+    picked = {}
+
+    for _ in range(attempts):
+        needed = count - len(picked)
+        if needed <= 0:
+            break
+        candidates = {randint(low, high) for _ in range(needed * oversample)}
+        candidates.difference_update(picked)
+        for obj in queryset.filter(pk__in=candidates)[:needed]:
+            picked[obj.pk] = obj
+
+    while len(picked) < count:
+        remaining = queryset.exclude(pk__in=list(picked)).order_by("pk")
+        obj = remaining.filter(pk__gte=randint(low, high)).first()
+        if obj is None:
+            obj = remaining.first()
+        if obj is None:
+            break
+        picked[obj.pk] = obj
+
+    items = list(picked.values())
+    shuffle(items)
+    return items
@@ -0,0 +1,162 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from eduportal.models import Position, PositionSearchDocument
+
+
+CONFIG = "simple"
+FTS_TABLE = "eduportal_positionsearchdocument_fts"
+FIELD_WEIGHTS = [
+    ("title", "A", 10.0),
+    ("tags", "B", 5.0),
+    ("people", "C", 2.0),
+    ("description", "D", 1.0),
+]
+DOCUMENT_FIELDS = [field for field, _, _ in FIELD_WEIGHTS]
+
+TERM_RE = re.compile(r"\w+")
+
+
+# Indexing ---------------------------------------------------------------------
+
+
+def build_document(position: Position):
+    professor = position.professor
+    people = [
+        professor.user.first_name,
+        professor.user.last_name,
+        professor.department,
+        professor.university.name if professor.university else "",
+    ]
+    return PositionSearchDocument(
+        position=position,
+        title=position.title,
+        tags=" ".join(tag.label for tag in position.tags.all()),
+        people=" ".join(part for part in people if part),
+        description=position.description,
+    )
+
+
+def index_positions(queryset):
+    positions = queryset.select_related(
+        "professor", "professor__user", "professor__university"
+    ).prefetch_related("tags")
+    documents = [build_document(position) for position in positions]
+    if not documents:
+        return 0
+
+    PositionSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["position"],
+        update_fields=DOCUMENT_FIELDS,
+    )
+
+    ids = [document.position_id for document in documents]
+    if connection.vendor == "postgresql":
+        vector = None
+        for field, weight, _ in FIELD_WEIGHTS:
+            field_vector = SearchVector(field, weight=weight, config=CONFIG)
+            vector = field_vector if vector is None else vector + field_vector
+        PositionSearchDocument.objects.filter(pk__in=ids).update(vector=vector)
+    elif has_fts_table():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+                f"({', '.join(['%s'] * len(ids))})",
+                ids,
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(DOCUMENT_FIELDS)}) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [
+                    [document.position_id]
+                    + [getattr(document, field) for field in DOCUMENT_FIELDS]
+                    for document in documents
+                ],
+            )
+
+    return len(documents)
+
+
+def unindex_position(position_id):
+    if connection.vendor == "sqlite" and has_fts_table():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [position_id])
+
+
+fts_tables = {}
+
+
+def has_fts_table():
+    # Looked up once per database; the table only comes and goes with
+    # migration 0035.
+    if connection.vendor != "sqlite":
+        return False
+    name = connection.settings_dict["NAME"]
+    if name not in fts_tables:
+        fts_tables[name] = FTS_TABLE in connection.introspection.table_names()
+    return fts_tables[name]
+
+
+# Searching --------------------------------------------------------------------
+
+
+def search_positions(queryset, query, order_by_rank=True, fields=None):
+    # `fields` limits matching to some of the document fields.
+    terms = TERM_RE.findall(query)
+    if not terms:
+        return queryset
+    fields = fields or DOCUMENT_FIELDS
+
+    if connection.vendor == "postgresql":
+        weights = "".join(
+            weight for field, weight, _ in FIELD_WEIGHTS if field in fields
+        )
+        search_query = SearchQuery(
+            " & ".join(f"{term}:*{weights}" for term in terms),
+            search_type="raw",
+            config=CONFIG,
+        )
+        queryset = queryset.filter(search_document__vector=search_query).annotate(
+            search_rank=SearchRank(F("search_document__vector"), search_query)
+        )
+    elif has_fts_table():
+        match = fts_match(terms, fields)
+        table = queryset.model._meta.db_table
+        weights = ", ".join(str(weight) for _, _, weight in FIELD_WEIGHTS)
+        queryset = queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+            )
+        ).annotate(
+            # bm25() is lower-is-better, so negate it to sort like ts_rank.
+            search_rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+                [match],
+                output_field=FloatField(),
+            )
+        )
+    else:
+        for term in terms:
+            term_filter = Q()
+            for field in fields:
+                term_filter |= Q(**{f"search_document__{field}__icontains": term})
+            queryset = queryset.filter(term_filter)
+        queryset = queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    if order_by_rank:
+        queryset = queryset.order_by("-search_rank", "-id")
+    return queryset
+
+
+def fts_match(terms, fields):
+    columns = "{%s}" % " ".join(fields)
+    return " AND ".join(
+        '{} : "{}"*'.format(columns, term.replace('"', "")) for term in terms
+    )
@@ -1,8 +1,7 @@
-from bisect import bisect_right
 from pprint import pprint
-from random import sample
 from django.contrib.auth import get_user_model
-from django.db.models import Prefetch, Min, Count, Avg, Q, Value
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, Min, Count, Avg, OuterRef, Q, Subquery, Value
 from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404, render
 from django_filters.rest_framework import DjangoFilterBackend
@@ -18,10 +17,17 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 
 from .models import *
-from .pagination import PaginatedActionMixin
+from .pagination import (
+    PaginatedActionMixin,
+    StreamingListMixin,
+    StreamingResponseMixin,
+    streaming_http_response,
+)
 from .permissions import *
 from .serializers import *
 from .utils.views import *
+from .utils import bulk_requests, chats, exports, landing
+from .utils.notifications import adjust_counters, batched_counters, get_counts
 from .filters import *
 from .forms import *
 
@@ -35,138 +41,8 @@ User = get_user_model()
 
 class LandingViewSet(GenericViewSet):
     def list(self, request):
-        professor_count = Professor.objects.count()
-        student_count = Student.objects.count()
-
-        top_professors = self.get_top_professors(3)
-        top_students = self.get_top_students(3)
-        random_positions = self.get_random_positions(top_professors, 4)
-
-        unis = list(
-            University.objects.only(
-                "id",
-                "name",
-                "icon",
-                "rank",
-            ).order_by("rank")
-        )
-        top_universities = unis[:3]
-        random_universities = self.sample_random_universities(unis, 18)
-
-        return Response(
-            {
-                "professor_count": professor_count,
-                "student_count": student_count,
-                "growth": self.calculate_growth(),
-                "random_universities": self.serialize(
-                    request, random_universities, LandingUniversitySerializer, True
-                ),
-                "top_universities": self.serialize(
-                    request, top_universities, LandingUniversitySerializer, True
-                ),
-                "top_professors": self.serialize(
-                    request, top_professors, LandingProfessorSerializer, True
-                ),
-                "top_students": self.serialize(
-                    request, top_students, LandingStudentSerializer, True
-                ),
-                "professor_view_positions": self.serialize(
-                    request, random_positions[:2], ProfessorPositionListSerializer, True
-                ),
-                "student_view_positions": self.serialize(
-                    request, random_positions[2:], StudentPositionListSerializer, True
-                ),
-            }
-        )
-
-    def calculate_growth(self):
-        users = list(
-            User.objects.values_list("date_joined", flat=True).order_by("date_joined")
-        )
-
-        site_creation_date = users[0] if users else timezone.now()
-        today = timezone.now()
-
-        delta = (today - site_creation_date) / 4
-        date_points = [site_creation_date + i * delta for i in range(1, 5)]
-
-        growth = []
-        for date in date_points:
-            idx = bisect_right(users, date)
-            user_count = idx
-            growth.append((date.date(), user_count))
-
-        return growth
-
-    def serialize(self, request, items, serializer, many=False):
-        ser = serializer(items, many=many)
-        return ser.data
-
-    def get_top_professors(self, count):
-        professors = (
-            Professor.objects.annotate(
-                accepted_request_count=models.Count(
-                    "positions__request",
-                    filter=models.Q(positions__request__status="SA"),
-                )
-            )
-            .select_related("user")
-            .order_by("-accepted_request_count")[:count]
-        )
-
-        professors = list(professors)
-        for i, professor in enumerate(professors, start=1):
-            professor.rank = i
-
-        return professors
-
-    def get_top_students(self, count):
-        students = (
-            Student.objects.annotate(
-                accepted_request_count=models.Count(
-                    "request", filter=models.Q(request__status__in=["PA", "SA", "SR"])
-                )
-            )
-            .select_related("user")
-            .order_by("-accepted_request_count")[:count]
-        )
-
-        students = list(students)
-        for i, student in enumerate(students, start=1):
-            student.rank = i
-
-        return students
-
-    def sample_random_universities(self, universities, count):
-        if len(universities) >= count:
-            random_unis = sample(universities, count)
-        else:
-            random_unis = universities
-
-        return random_unis
-
-    def get_random_positions(self, professors, count):
-        positions = (
-            (professors[0].positions.all() if professors else Position.objects.none())
-            .select_related("professor", "professor__user", "professor__university")
-            .prefetch_related("tags", "tags2")
-        )
-
-        for p in professors[1:]:
-            positions = positions.union(
-                p.positions.all()
-                .select_related("professor", "professor__user", "professor__university")
-                .prefetch_related("tags", "tags2")
-            )
-
-        positions = list(positions)
-
-        if len(positions) >= count:
-            random_positions = sample(positions, count)
-        else:
-            random_positions = positions
-
-        return random_positions
+        snapshot = landing.get_snapshot()
+        return Response(landing.render_snapshot(snapshot))
 
 
 # User Views -------------------------------------------------------------------
@@ -290,18 +166,24 @@ class ProfessorViewSet(
     @action(detail=False, methods=["GET"], permission_classes=[IsProfessor])
     def my_positions(self, request):
         professor = request.user.professor
-        positions = Position.objects.filter(professor=professor)
+        positions = Position.objects.with_status().filter(professor=professor)
         positions = positions.select_related(
             "professor", "professor__user", "professor__university"
         ).prefetch_related("tags", "tags2")
-        return self.paginated_action(positions, OwnerPositionListSerializer)
+        return self.paginated_action(
+            positions,
+            OwnerPositionListSerializer,
+            cursor_ordering=("-created_at", "-id"),
+        )
 
     @action(detail=False, methods=["GET"], permission_classes=[IsProfessor])
     def my_recent_positions(self, request):
         professor = request.user.professor
-        positions = Position.objects.filter(professor=professor).order_by(
-            "-start_date"
-        )[:5]
+        positions = (
+            Position.objects.with_status()
+            .filter(professor=professor)
+            .order_by("-start_date")[:5]
+        )
         positions = positions.select_related(
             "professor", "professor__user", "professor__university"
         ).prefetch_related("tags", "tags2")
@@ -320,16 +202,8 @@ class TagListViewSet(
 
 
 class PositionViewSet(ModelViewSet):
-    filter_backends = [SearchFilter]
-    search_fields = [
-        "title",
-        "description",
-        "professor__user__first_name",
-        "professor__user__last_name",
-        "professor__department",
-        "professor__university__name",
-        "tags__label",
-    ]
+    filter_backends = [PositionSearchFilter]
+    cursor_ordering = ("-created_at", "-id")
 
     def get_serializer_class(self):
         action = self.action
@@ -367,13 +241,25 @@ class PositionViewSet(ModelViewSet):
             case _:
                 return None
 
+    def perform_create(self, serializer):
+        # Tags are added after the INSERT; the outbox event they publish must
+        # commit together with the position.
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
     def get_queryset(self):
         user = self.request.user
         user_type = get_user_type(self.request)
 
-        queryset = Position.objects.select_related(
-            "professor", "professor__user", "professor__university"
-        ).prefetch_related("tags", "tags2")
+        queryset = (
+            Position.objects.with_status()
+            .select_related("professor", "professor__user", "professor__university")
+            .prefetch_related("tags", "tags2")
+        )
 
         if self.action == "list":
             queryset = queryset.exclude(professor__user__id=user.id)
@@ -473,7 +359,7 @@ class StudentRequestListViewSet(ModelViewSet):
         queryset = queryset.filter(student__id=self.request.user.student.id)
         return super().filter_queryset(queryset)
 
-class RequestViewSet(ModelViewSet):
+class RequestViewSet(StreamingResponseMixin, ModelViewSet):
     http_method_names = ["post", "get", "delete"]
 
     def get_queryset(self):
@@ -504,6 +390,8 @@ class RequestViewSet(ModelViewSet):
                 return ProfessorRequestDetailSerializer
         if self.action == "list":
             return RequestListSeralizer
+        if self.action == "professor_bulk_respond":
+            return ProfessorBulkResponseSerializer
         return RequestListSeralizer
 
     @action(
@@ -513,25 +401,45 @@ class RequestViewSet(ModelViewSet):
     )
     def professor_accept_request(self, request, *args, **kwargs):
         request_id = int(kwargs["pk"])
-        request_object = get_object_or_404(Request, pk=request_id)
+        request_object = get_object_or_404(
+            Request.objects.with_parties(), pk=request_id
+        )
         if request_object.status != "PP":
             return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
-        position = Position.objects.get(pk=request_object.position.id)
-        if position.filled == position.capacity:
-            return Response(
-                "This position is filled.", status=status.HTTP_405_METHOD_NOT_ALLOWED
+        position = request_object.position
+        with transaction.atomic():
+            if not Position.objects.try_fill(position.id):
+                return Response(
+                    "This position is filled.",
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED,
+                )
+            if not request_object.accept():
+                transaction.set_rollback(True)
+                return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            new_chat = ChatSystem.objects.create(group_name=" ")
+            new_chat.participants.set(
+                [position.professor.user, request_object.student.user.id]
             )
-        position.filled += 1
-        position.save()
-        request_object.status = "PA"
-        request_object.save()
-        new_chat = ChatSystem.objects.create(group_name=" ")
-        new_chat.participants.set(
-            [position.professor.user, request_object.student.user.id]
-        )
-        new_chat.save()
         return Response(status=status.HTTP_200_OK)
 
+    @action(
+        detail=False,
+        methods=["POST"],
+        permission_classes=[IsAuthenticated, IsProfessor],
+    )
+    def professor_bulk_respond(self, request, *args, **kwargs):
+        serializer = ProfessorBulkResponseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk_requests.professor_respond(
+            request.user.professor,
+            serializer.validated_data["ids"],
+            serializer.validated_data["status"],
+        )
+        return Response(
+            [{"id": pk, "result": result} for pk, result in results.items()],
+            status=status.HTTP_200_OK,
+        )
+
     @action(
         detail=True,
         methods=["GET"],
@@ -539,11 +447,11 @@ class RequestViewSet(ModelViewSet):
     )
     def professor_reject_request(self, request, *args, **kwargs):
         request_id = int(kwargs["pk"])
-        request_object = get_object_or_404(Request, pk=request_id)
-        if request_object.status != "PP":
+        request_object = get_object_or_404(
+            Request.objects.with_parties(), pk=request_id
+        )
+        if not request_object.reject():
             return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
-        request_object.status = "PR"
-        request_object.save()
         return Response(status=status.HTTP_200_OK)
 
     @action(
@@ -553,23 +461,21 @@ class RequestViewSet(ModelViewSet):
     )
     def student_reject_request(self, request, *args, **kwargs):
         request_id = int(kwargs["pk"])
-        request_object = get_object_or_404(Request, pk=request_id)
-        if request_object.status != "PA":
-            return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
-        position = Position.objects.get(pk=request_object.position.id)
-        position.filled -= 1
-        position.save()
-        request_object.status = "SR"
-        request_object.save()
-        professor_user = request_object.position.professor.user
-        student_user = request_object.student.user.chats
-        chat = (
-            professor_user.chats.intersecion(student_user.chats)
-            .filter(chat_enable=True)
-            .get()
+        request_object = get_object_or_404(
+            Request.objects.with_parties(), pk=request_id
         )
-        chat.enable_chat = False
-        chat.save()
+        # The position is updated before the request, as in
+        # professor_accept_request, so the two can't deadlock.
+        with transaction.atomic():
+            Position.objects.release_seat(request_object.position_id)
+            if not request_object.student_reject():
+                transaction.set_rollback(True)
+                return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+            ChatSystem.objects.filter(
+                participants=request_object.position.professor.user_id
+            ).filter(participants=request_object.student.user_id).update(
+                chat_enable=False
+            )
         return Response(status=status.HTTP_200_OK)
 
     @action(
@@ -579,11 +485,11 @@ class RequestViewSet(ModelViewSet):
     )
     def student_accept_request(self, request, *args, **kwargs):
         request_id = int(kwargs["pk"])
-        request_object = get_object_or_404(Request, pk=request_id)
-        if request_object.status != "PA":
+        request_object = get_object_or_404(
+            Request.objects.with_parties(), pk=request_id
+        )
+        if not request_object.student_accept():
             return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
-        request_object.status = "SA"
-        request_object.save()
         return Response(status=status.HTTP_200_OK)
 
     def destroy(self, request, *args, **kwargs):
@@ -601,53 +507,60 @@ class RequestViewSet(ModelViewSet):
             queryset = queryset.select_related("position").filter(
                 position__professor__id=request.user.professor.id
             )
-        seializer = RequestListSeralizer(queryset, many=True)
-        return Response(seializer.data)
+        return self.streaming_response(queryset, RequestListSeralizer)
 
     def create(self, request, *args, **kwargs):
-        student = Student.objects.get(pk=request.user.student.id)
-        sent_requests = student.request_set.filter(
-            position__id=request.data.get("position_id")
-        )
-        if sent_requests.exists():
-            if sent_requests.filter(status="R").exists():
-                return Response(
-                    "You are not allowed to request anymore",
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-            return Response(
-                "Request already exists", status=status.HTTP_400_BAD_REQUEST
-            )
-        position = Position.objects.get(pk=request.data.get("position_id"))
-        if position.filled == 1:
-            Response(
-                "This position is completed.", status=status.HTTP_405_METHOD_NOT_ALLOWED
-            )
-        if position.end_date < timezone.now().date():
-            return Response(
-                "The deadline is finished.", status=status.HTTP_405_METHOD_NOT_ALLOWED
-            )
-
         serializer = StudentCreateRequestSerializer(
             data=request.data,
             context={
-                "student_id": student.id,
+                "student_id": request.user.student.id,
             },
         )
         serializer.is_valid(raise_exception=True)
-        saved_request = serializer.save()
-        position.request_count += 1
-        position.save()
+        position_id = serializer.validated_data["position_id"]
+
+        # The counter bump doubles as the deadline check, and the unique
+        # (student, position) constraint rejects duplicates; either failure
+        # rolls the other statement back.
+        try:
+            with transaction.atomic():
+                open_positions = Position.objects.filter(
+                    end_date__gte=timezone.now().date()
+                )
+                if not open_positions.bump_request_count(position_id):
+                    get_object_or_404(Position, pk=position_id)
+                    return Response(
+                        "The deadline is finished.",
+                        status=status.HTTP_405_METHOD_NOT_ALLOWED,
+                    )
+                saved_request = serializer.save()
+        except IntegrityError:
+            # Only the unique constraint means a duplicate; integrity errors
+            # raised by post_save receivers must surface as they are.
+            duplicate = Request.objects.filter(
+                student_id=request.user.student.id, position_id=position_id
+            ).exists()
+            if not duplicate:
+                raise
+            return Response(
+                "Request already exists", status=status.HTTP_400_BAD_REQUEST
+            )
         serializer = StudentCreateRequestSerializer(saved_request)
         return Response(serializer.data)
 
 
-class AdmissionViewSet(UpdateModelMixin, ListModelMixin, GenericViewSet):
+class AdmissionViewSet(
+    StreamingListMixin, UpdateModelMixin, ListModelMixin, GenericViewSet
+):
     http_method_names = ["get", "patch"]
 
     def get_queryset(self):
         if self.action == "list":
-            return Request.objects.filter(status="A", share_with_others=True).all()
+            return (
+                Request.objects.filter(status="A", share_with_others=True)
+                .select_related("student__user", "student__image")
+                .prefetch_related("student__interest_tags")
+            )
         if self.action == "partial_update":
             return Request.objects.filter(status="A").all()
         return None
@@ -676,14 +589,20 @@ class AdmissionViewSet(UpdateModelMixin, ListModelMixin, GenericViewSet):
 # Position Filtering Views -----------------------------------------------------
 
 
-class ProfessorOwnPositionFilteringViewSet(ListModelMixin, GenericViewSet):
+class ProfessorOwnPositionFilteringViewSet(
+    StreamingListMixin, ListModelMixin, GenericViewSet
+):
     serializer_class = ProfessorPositionFilterSerializer
     permission_classes = [IsAuthenticated, IsProfessor, IsPositionOwner]
-    filter_backends = [OrderingFilter, SearchFilter, DjangoFilterBackend]
+    filter_backends = [OrderingFilter, PositionSearchFilter, DjangoFilterBackend]
     filterset_class = ProfessorOwnPositionFilter
-    ordering_fields = ["request_count", "fee", "position_start_date"]
-    search_fields = ["title"]
+    search_document_fields = ["title"]
+    ordering_fields = ["request_count", "fee", "position_start_date", "status"]
     queryset = Position.objects.all()
+    cursor_ordering = ("-created_at", "-id")
+
+    def get_queryset(self):
+        return Position.objects.with_status()
 
     def filter_queryset(self, queryset):
         return (
@@ -693,13 +612,19 @@ class ProfessorOwnPositionFilteringViewSet(ListModelMixin, GenericViewSet):
         )
 
 
-class ProfessorOwnPositionSearchViewSet(ListModelMixin, GenericViewSet):
+class ProfessorOwnPositionSearchViewSet(
+    StreamingListMixin, ListModelMixin, GenericViewSet
+):
     serializer_class = ProfessorPositionSearchSerializer
     permission_classes = [IsAuthenticated, IsProfessor, IsPositionOwner]
-    filter_backends = [SearchFilter]
+    filter_backends = [PositionSearchFilter]
     filterset_class = ProfessorOwnPositionFilter
-    search_fields = ["title", "description"]
+    search_document_fields = ["title", "description"]
     queryset = Position.objects.all()
+    cursor_ordering = ("-created_at", "-id")
+
+    def get_queryset(self):
+        return Position.objects.with_status()
 
     def filter_queryset(self, queryset):
         return (
@@ -709,14 +634,20 @@ class ProfessorOwnPositionSearchViewSet(ListModelMixin, GenericViewSet):
         )
 
 
-class ProfessorOtherPositionFilteringViewSet(ListModelMixin, GenericViewSet):
+class ProfessorOtherPositionFilteringViewSet(
+    StreamingListMixin, ListModelMixin, GenericViewSet
+):
     serializer_class = ProfessorPositionListSerializer
     permission_classes = [IsAuthenticated, IsProfessor]
-    filter_backends = [OrderingFilter, SearchFilter, DjangoFilterBackend]
+    filter_backends = [OrderingFilter, PositionSearchFilter, DjangoFilterBackend]
     filterset_class = ProfessorOtherPositionFilter
-    search_fields = ["title"]
+    search_document_fields = ["title"]
     queryset = Position.objects.all()
-    ordering_fields = ["fee", "position_start_date"]
+    cursor_ordering = ("-created_at", "-id")
+    ordering_fields = ["fee", "position_start_date", "status"]
+
+    def get_queryset(self):
+        return Position.objects.with_status()
 
     def filter_queryset(self, queryset):
         return (
@@ -726,27 +657,34 @@ class ProfessorOtherPositionFilteringViewSet(ListModelMixin, GenericViewSet):
         )
 
 
-class StudentPositionFilteringViewSet(ListModelMixin, GenericViewSet):
+class StudentPositionFilteringViewSet(
+    StreamingListMixin, ListModelMixin, GenericViewSet
+):
     serializer_class = StudentPositionListSerializer
     permission_classes = [IsAuthenticated, IsStudent]
     filter_backends = [OrderingFilter, DjangoFilterBackend]
     filterset_class = StudentPositionFilter
     queryset = Position.objects.all()
-    ordering_fields = ["fee", "position_start_date"]
+    cursor_ordering = ("-created_at", "-id")
+    ordering_fields = ["fee", "position_start_date", "status"]
+
+    def get_queryset(self):
+        return Position.objects.with_status()
 
 
 # Request Filtering Views ------------------------------------------------------
 
 
-class StudentRequestFilteringViewSet(ListModelMixin, GenericViewSet):
+class StudentRequestFilteringViewSet(
+    StreamingListMixin, ListModelMixin, GenericViewSet
+):
     serializer_class = RequestListSeralizer
     permission_classes = [IsAuthenticated, IsStudent, IsRequestOwner]
     filter_backends = [OrderingFilter, DjangoFilterBackend]
     filterset_class = StudentRequestFilter
     ordering_fields = ["fee", "position_start_date", "date_applied"]
-    queryset = (
-        Request.objects.select_related("student").order_by("date_applied").reverse()
-    )
+    cursor_ordering = ("-date_applied", "-id")
+    queryset = Request.objects.select_related("student").order_by("-date_applied")
 
     def filter_queryset(self, queryset):
         return (
@@ -756,15 +694,16 @@ class StudentRequestFilteringViewSet(ListModelMixin, GenericViewSet):
         )
 
 
-class ProfessorRequestFilteringViewSet(ListModelMixin, GenericViewSet):
+class ProfessorRequestFilteringViewSet(
+    StreamingListMixin, ListModelMixin, GenericViewSet
+):
     serializer_class = RequestListSeralizer
     permission_classes = [IsAuthenticated, IsProfessor, IsRequestOwner]
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProfessorRequestFilter
-    queryset = (
-        Request.objects.select_related("position", "student")
-        .order_by("date_applied")
-        .reverse()
+    cursor_ordering = ("-date_applied", "-id")
+    queryset = Request.objects.select_related("position", "student").order_by(
+        "-date_applied"
     )
 
     def filter_queryset(self, queryset):
@@ -774,6 +713,25 @@ class ProfessorRequestFilteringViewSet(ListModelMixin, GenericViewSet):
             .filter(position__professor__id=self.request.user.professor.id)
         )
 
+    @action(detail=False, methods=["GET"])
+    def export(self, request):
+        # `?file_format=` because DRF reserves `?format=` for renderer selection.
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in exports.EXPORT_FORMATS:
+            return Response(
+                f"Unsupported file format: {file_format}",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        chunks, content_type, extension = exports.export_applicants(
+            queryset, file_format
+        )
+        response = streaming_http_response(request, chunks, content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="applicants.{extension}"'
+        )
+        return response
+
 
 # CV Views ---------------------------------------------------------------------
 
@@ -886,82 +844,33 @@ class NotificationViewSet(
 ):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated, IsNotificationOwner]
+    cursor_ordering = "-id"
 
     def get_raw_queryset(self, **filters):
         return Notification.objects.filter(user=self.request.user, **filters)
 
     def get_queryset(self, **filters):
-        queryset = self.get_raw_queryset(**filters).order_by("-id")
-
-        content_types = ContentType.objects.filter(
-            notificationitem__notifications__in=queryset
-        ).distinct()
-
-        for ct in content_types:
-            qs = NotificationItem.objects.filter(content_type=ct)
-
-            match (ct.app_label, ct.model):
-                case ("eduportal", "request"):  # request
-                    queryset = queryset.prefetch_related(
-                        Prefetch(
-                            "items",
-                            queryset=qs.prefetch_related(
-                                "content_object",
-                                "content_object__student",
-                                "content_object__student__university",
-                                "content_object__student__user",
-                                "content_object__position",
-                                "content_object__position__professor",
-                                "content_object__position__professor__university",
-                                "content_object__position__professor__user",
-                            ),
-                            to_attr=f"{ct.app_label}_{ct.model}_items",
-                        )
-                    )
-                case ("eduportal", "position"):  # position
-                    queryset = queryset.prefetch_related(
-                        Prefetch(
-                            "items",
-                            queryset=qs.prefetch_related(
-                                "content_object",
-                                "content_object__professor",
-                                "content_object__professor__university",
-                                "content_object__professor__user",
-                            ),
-                            to_attr=f"{ct.app_label}_{ct.model}_items",
-                        )
-                    )
-                case ("eduportal", "student"):  # student
-                    queryset = queryset.prefetch_related(
-                        Prefetch(
-                            "items",
-                            queryset=qs.prefetch_related(
-                                "content_object",
-                                "content_object__university",
-                                "content_object__user",
-                            ),
-                            to_attr=f"{ct.app_label}_{ct.model}_items",
-                        )
-                    )
-                case _:
-                    queryset = queryset.prefetch_related(
-                        Prefetch(
-                            "items",
-                            queryset=qs,
-                            to_attr=f"{ct.app_label}_{ct.model}_items",
-                        )
-                    )
-        return queryset
+        return self.get_raw_queryset(**filters).order_by("-id")
+
+    def perform_destroy(self, instance):
+        # The post_delete receiver adjusts the counters from the row it was
+        # given; locking it first keeps a concurrent delete from counting it
+        # twice and a concurrent mark_as_read from making `read` stale.
+        with transaction.atomic():
+            locked = Notification.objects.select_for_update().filter(pk=instance.pk)
+            locked = locked.first()
+            if locked is not None:
+                locked.delete()
 
     @action(detail=False, methods=["GET"])
     def all_count(self, request):
-        count = self.get_raw_queryset().count()
-        return Response({"count": count})
+        total, unread = get_counts(request.user)
+        return Response({"count": total})
 
     @action(detail=False, methods=["GET"])
     def new_count(self, request):
-        count = self.get_raw_queryset(read=False).count()
-        return Response({"count": count})
+        total, unread = get_counts(request.user)
+        return Response({"count": unread})
 
     @action(detail=False, methods=["GET"])
     def new_notifications(self, request):
@@ -983,15 +892,19 @@ class NotificationViewSet(
         notification = get_object_or_404(
             Notification, user=request.user, pk=self.kwargs["pk"]
         )
+        if Notification.objects.filter(pk=notification.pk, read=False).update(
+            read=True
+        ):
+            adjust_counters({request.user.id: (0, -1)})
         notification.read = True
-        notification.save()
         serializer = self.get_serializer(notification)
         return Response(serializer.data)
 
     @action(detail=False, methods=["GET"])
     def read_all(self, request):
         unread_notifications = self.get_raw_queryset(read=False)
-        unread_notifications.update(read=True)
+        count = unread_notifications.update(read=True)
+        adjust_counters({request.user.id: (0, -count)})
         return Response({"detail": "All notifications have been marked as read."})
 
     @action(detail=True, methods=["GET"])
@@ -1010,8 +923,10 @@ class NotificationViewSet(
     @action(detail=False, methods=["GET"])
     def delete_all(self, request):
         notifications = self.get_raw_queryset(bookmarked=False)
-        count = notifications.count()
-        notifications.delete()
+        with transaction.atomic(), batched_counters():
+            ids = list(notifications.select_for_update().values_list("pk", flat=True))
+            deleted = Notification.objects.filter(pk__in=ids).delete()[1]
+        count = deleted.get(Notification._meta.label, 0)
         return Response(
             {"detail": f"{count} unbookmarked notifications have been deleted."}
         )
@@ -1025,21 +940,10 @@ class TopStudentsViewSet(ListModelMixin, GenericViewSet):
     permission_classes = [IsAuthenticated, IsProfessor]
 
     def get_queryset(self):
-        educations_with_date = EducationHistory.objects.exclude(end_date__isnull=True)
-
         return (
-            Student.objects.select_related("cv", "user", "university")
+            Student.objects.select_related("cv", "user", "university", "image")
             .filter(major=self.request.user.professor.major)
-            .annotate(
-                avg_grade=Coalesce(
-                    Avg(
-                        "cv__education_histories__grade",
-                        filter=Q(cv__education_histories__in=educations_with_date),
-                    ),
-                    Value(0.0)
-                )
-            )
-            .order_by("-avg_grade")
+            .order_by("-avg_grade", "id")
         )
 
     # def list(self, request, *args, **kwargs):
@@ -1074,9 +978,8 @@ class TopProfessorsViewSet(ListModelMixin, GenericViewSet):
         return (
             Professor.objects.filter(major__isnull=False)
             .filter(major=self.request.user.student.major)
-            .select_related("cv")
-            .annotate(project_num=Count("cv__project_experiences"))
-            .order_by("-project_num")
+            .select_related("user", "university", "image")
+            .order_by("-project_count", "id")
         )
 
     # def list(self, request, *args, **kwargs):
@@ -1103,10 +1006,13 @@ class ChatListViewSet(ListModelMixin, GenericViewSet):
 
     def list(self, request, *args, **kwargs):
         user = self.request.user.id
+        unread = ChatUnreadCounter.objects.filter(chat=OuterRef("pk"), user=user)
         base_query = (
             ChatSystem.objects.filter(start_chat=True)
+            .select_related("last_message_user")
             .prefetch_related("participants")
             .filter(participants__pk=user)
+            .annotate(unread_count=Subquery(unread.values("count")[:1]))
         )
         serializer = ChatSystemSerializer(
             base_query, many=True, context={"request": request}
@@ -1148,7 +1054,7 @@ class StartNewChatViewSet(RetrieveModelMixin, GenericViewSet):
         return Response("Chat created", status=status.HTTP_200_OK)
 
 
-class ChatMessagesViewSet(RetrieveModelMixin, GenericViewSet):
+class ChatMessagesViewSet(StreamingResponseMixin, RetrieveModelMixin, GenericViewSet):
     serializer_class = RetrieveMessageSerializer
     permission_classes = [IsAuthenticated]
     queryset = Message.objects.all()
@@ -1157,9 +1063,10 @@ class ChatMessagesViewSet(RetrieveModelMixin, GenericViewSet):
         chat_pk = self.kwargs["pk"]
         chat = ChatSystem.objects.get(pk=chat_pk)
         messages = chat.messages.all()
-        sorted_query = messages.order_by("send_time")
-        serializer = RetrieveMessageSerializer(sorted_query, many=True)
-        return Response(serializer.data)
+        sorted_query = messages.select_related("user", "related_chat_group").order_by(
+            "send_time"
+        )
+        return self.streaming_response(sorted_query, RetrieveMessageSerializer)
 
 
 class UpdateLastSeenMessageViewSet(RetrieveModelMixin, GenericViewSet):
@@ -1173,6 +1080,7 @@ class UpdateLastSeenMessageViewSet(RetrieveModelMixin, GenericViewSet):
         other_user_messages = messages.exclude(user=user)
         not_seen_messags = other_user_messages.filter(seen_flag=False)
         updated_messages = not_seen_messags.update(seen_flag=True)
+        chats.mark_seen(chat.pk, user)
         return Response(status=status.HTTP_200_OK)
 
 
@@ -1184,9 +1092,7 @@ class CreateMessageViewSet(CreateModelMixin, GenericViewSet):
     def create(self, request, *args, **kwargs):
         chat_pk = request.data.get("related_chat_group")
         chat = ChatSystem.objects.get(pk=chat_pk)
-        last_message = chat.messages.all().order_by("-send_time").first()
-        user = request.user
-        if last_message is not None and last_message.user == user:
+        if chat.last_message_user_id == request.user.id:
             return Response(
                 "It's not your turn.", status=status.HTTP_405_METHOD_NOT_ALLOWED
             )
@@ -0,0 +1,139 @@
+# Generated by Django 5.0.4 on 2026-10-18 19:47
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def summarize_chats(apps, schema_editor):
+    ChatSystem = apps.get_model("ticketing_system", "ChatSystem")
+    ChatUnreadCounter = apps.get_model("ticketing_system", "ChatUnreadCounter")
+    Message = apps.get_model("ticketing_system", "Message")
+
+    latest = Message.objects.filter(related_chat_group=OuterRef("pk")).order_by("-id")
+    chats = list(
+        ChatSystem.objects.annotate(latest_id=Subquery(latest.values("id")[:1]))
+        .filter(latest_id__isnull=False)
+        .only("id")
+    )
+    messages = Message.objects.in_bulk([chat.latest_id for chat in chats])
+    for chat in chats:
+        message = messages[chat.latest_id]
+        chat.last_message_id = message.pk
+        chat.last_message_user_id = message.user_id
+        chat.last_message_time = message.send_time
+        chat.last_message_preview = message.text[:50]
+    ChatSystem.objects.bulk_update(
+        chats,
+        [
+            "last_message",
+            "last_message_user",
+            "last_message_time",
+            "last_message_preview",
+        ],
+        batch_size=500,
+    )
+
+    unseen = defaultdict(dict)
+    for row in (
+        Message.objects.filter(seen_flag=False)
+        .order_by()
+        .values("related_chat_group_id", "user_id")
+        .annotate(count=Count("id"))
+    ):
+        unseen[row["related_chat_group_id"]][row["user_id"]] = row["count"]
+    Participant = ChatSystem.participants.through
+    counters = []
+    for participant in Participant.objects.filter(chatsystem_id__in=unseen):
+        by_sender = unseen[participant.chatsystem_id]
+        count = sum(by_sender.values()) - by_sender.get(participant.user_id, 0)
+        if count:
+            counters.append(
+                ChatUnreadCounter(
+                    chat_id=participant.chatsystem_id,
+                    user_id=participant.user_id,
+                    count=count,
+                )
+            )
+    ChatUnreadCounter.objects.bulk_create(counters, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ticketing_system", "0007_chatsystem_participants_delete_chatmembers"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatsystem",
+            name="last_message",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="ticketing_system.message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chatsystem",
+            name="last_message_preview",
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name="chatsystem",
+            name="last_message_time",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="chatsystem",
+            name="last_message_user",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ChatUnreadCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "chat",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="unread_counters",
+                        to="ticketing_system.chatsystem",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="chatunreadcounter",
+            constraint=models.UniqueConstraint(
+                fields=("chat", "user"), name="chat_unread_counter_unique_user"
+            ),
+        ),
+        migrations.RunPython(summarize_chats, migrations.RunPython.noop),
+    ]
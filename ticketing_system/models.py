@@ -14,6 +14,15 @@ class ChatSystem(models.Model):
         USER_MODEL,
         related_name="chats",
     )
+    # Summary of the newest message, kept up to date by eduportal/utils/chats.py.
+    last_message = models.ForeignKey(
+        "Message", null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    last_message_user = models.ForeignKey(
+        USER_MODEL, null=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    last_message_time = models.DateTimeField(null=True)
+    last_message_preview = models.CharField(max_length=50, blank=True)
 
 
 class Message(models.Model):
@@ -28,3 +37,19 @@ class Message(models.Model):
         on_delete=models.SET_NULL,
     )
     seen_flag = models.BooleanField(default=False)
+
+
+class ChatUnreadCounter(models.Model):
+    # Messages from others that `user` hasn't seen in `chat`.
+    chat = models.ForeignKey(
+        ChatSystem, on_delete=models.CASCADE, related_name="unread_counters"
+    )
+    user = models.ForeignKey(USER_MODEL, on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["chat", "user"], name="chat_unread_counter_unique_user"
+            ),
+        ]